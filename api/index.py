@@ -1,6 +1,13 @@
-from fastapi import FastAPI, HTTPException, Request, Header
-from supabase import create_client, Client
+from fastapi import FastAPI, HTTPException, Request, Header, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import asyncio
+import time
 import os
+import sys
 from dotenv import load_dotenv
 import hmac
 import hashlib
@@ -8,33 +15,63 @@ from pathlib import Path
 import logging
 import httpx
 import base64
-from notion_client import Client
 
+# Load environment variables from .env.local in parent directory, before the
+# api.src modules read their settings
+env_path = Path(__file__).parent.parent / '.env.local'
+load_dotenv(env_path)
 
 from api.src.db.supabase import (
-    insert_data,
-    select_data
+    async_insert_data,
+    async_select_data,
+    async_select_page,
+    close_async_client
+)
+from api.src.db.outbox import Outbox, OutboxWorkerPool
+from api.src.utils import TTLCache, conditional_response, json_dumps, parse_fields, project
+from api.src import metrics
+from api.src.singleflight import coalesce, single_flight
+from api.src.db.credentials import (
+    credential_cache,
+    get_integration,
+    refresh_integration
 )
 
 from api.src.notion.notion import(
     init_notion,
-    get_todo_items,
+    iter_todo_items,
     create_conv_page,
+    TODO_PROPERTIES,
     add_todo_item
 
 )
+from api.src.notion.client_pool import NOTION_BASE_URL, notion_pool, get_notion_client
+from api.src.notion.todo_mirror import todo_mirrors, TODO_MIRROR_MAX_AGE
+from api.src.services.gcal_sync import calendar_sync
+from api.src.services.outbound import outbound
+from api.src.services.scheduler import busy_from_events, plan_schedule, planning_window
+from api.src.config.calendar_config import (
+    SCHEDULE_BUFFER_MINUTES,
+    SCHEDULE_DAY_END,
+    SCHEDULE_DAY_START,
+    SCHEDULE_HORIZON_DAYS,
+    SCHEDULE_MAX_HORIZON_DAYS,
+    SCHEDULE_TASK_MINUTES
+)
 
-# Load environment variables from .env.local in parent directory
-env_path = Path(__file__).parent.parent / '.env.local'
-load_dotenv(env_path)
-
-url: str = os.getenv("SUPABASE_URL")
-print(url)
-key: str = os.getenv("SUPABASE_KEY")
-print(key)
 notion_client_id: str = os.getenv("NOTION_CLIENT_ID")
 notion_client_secret: str = os.getenv("NOTION_CLIENT_SECRET")
-supabase: Client = create_client(url, key)
+MAX_TODO_BATCH = 100
+MAX_SCHEDULE_COMMIT = 50
+CONVERSATIONS_PAGE_SIZE = 20
+MAX_CONVERSATION_BATCH = 1000
+MAX_CONVERSATIONS_PAGE_SIZE = 100
+
+# Background Notion onboarding state, keyed by user_id
+provisioning_status = TTLCache(maxsize=4096, ttl=3600)
+
+# Durable write-behind queue for conversation saves
+outbox_workers = OutboxWorkerPool(Outbox())
 
 # Configure logging
 logging.basicConfig(
@@ -45,14 +82,32 @@ logger = logging.getLogger(__name__)
 
 ### Create FastAPI instance with custom docs and openapi url
 app = FastAPI(docs_url="/api/py/docs", openapi_url="/api/py/openapi.json")
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Import calendar routes
-from api.src.routes.calendar_routes import router as calendar_router
+from api.src.routes.calendar_routes import router as calendar_router, get_calendar_service
 
 # Include calendar routes
 app.include_router(calendar_router)
 
 
+@app.on_event("startup")
+async def startup():
+    await outbox_workers.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await outbox_workers.stop()
+    await close_async_client()
+    await notion_pool.aclose()
+    # The search service pulls in the Gemini SDK, so it is only loaded by
+    # code that searches; close its connection pool if it was
+    search_service = sys.modules.get("api.src.services.gemini_service")
+    if search_service is not None:
+        await search_service.close_search_client()
+
+
 @app.get("/api/py/helloFastApi")
 def hello_fast_api():
     return {"message": "Hello from FastAPI"}
@@ -64,8 +119,7 @@ async def user(request: Request):
         data = await request.json()
 
         # Insert the user into your database
-        result = insert_data(
-            supabase=supabase,
+        result = await async_insert_data(
             table="users",
             data={
                 "user_id": data['user_id'],
@@ -95,13 +149,12 @@ async def user(request: Request):
 
 
 @app.post("/api/py/conversations")
-async def user(request: Request):
+async def create_conversation(request: Request):
     try:
         data = await request.json()
 
         # Insert the conversations into your database
-        result = insert_data(
-            supabase=supabase,
+        result = await async_insert_data(
             table="conversations",
             data={
                 "user_id": data['user_id'],
@@ -129,29 +182,98 @@ async def user(request: Request):
         )
 
 
-@app.get("/api/py/conversations/{user_id}")
-async def get_user_conversations(user_id, limit = None, offset = None):
+class ConversationRecord(BaseModel):
+    user_id: str
+    conversation_id: str
+
+
+class ConversationBatch(BaseModel):
+    conversations: List[ConversationRecord] = Field(min_length=1, max_length=MAX_CONVERSATION_BATCH)
+
+
+@app.post("/api/py/conversations/batch")
+async def create_conversations_batch(batch: ConversationBatch):
+    """
+    Record many conversations at once, e.g. when the voice agent backfills
+    after reconnecting. Rows are upserted on conversation_id as multi-row
+    statements, and each row reports its own outcome. When an id appears
+    more than once, the last occurrence is written and the earlier ones are
+    reported as duplicates.
+    """
     try:
-        # Set up the query parameters
-        filters = {"user_id": user_id}
-        order_by = {"created_at": "desc"}
+        latest = {record.conversation_id: index for index, record in enumerate(batch.conversations)}
+        indexes = sorted(latest.values())
+        rows = [batch.conversations[index].model_dump() for index in indexes]
+
+        result = await async_insert_data(
+            table="conversations",
+            data=rows,
+            upsert=True,
+            on_conflict="conversation_id"
+        )
+
+        errors = {}
+        for failure in result["failed"]:
+            for position in range(failure["start"], failure["end"]):
+                errors[indexes[position]] = failure["error"]
+
+        results = []
+        for index, record in enumerate(batch.conversations):
+            written_at = latest[record.conversation_id]
+            outcome = {"index": index, "conversation_id": record.conversation_id}
+            if written_at != index:
+                outcome["duplicate"] = True
+            if written_at in errors:
+                outcome.update(success=False, error=errors[written_at])
+            else:
+                outcome["success"] = True
+            results.append(outcome)
+        failed = sum(1 for r in results if not r["success"])
+
+        return {
+            "success": failed == 0,
+            "written": len(rows) - len(errors),
+            "failed": failed,
+            "results": results
+        }
 
-        # Query the database using your wrapper function
-        result = select_data(
-            supabase=supabase,
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
+        )
+
+
+@app.get("/api/py/conversations/{user_id}")
+async def get_user_conversations(
+    user_id: str,
+    limit: int = Query(CONVERSATIONS_PAGE_SIZE, ge=1, le=MAX_CONVERSATIONS_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    A page of the user's conversation ids, newest first. Pass the
+    response's next_cursor to fetch the following page; it is null on the
+    last page.
+    """
+    try:
+        page = await async_select_page(
             table="conversations",
             columns="conversation_id",
-            filters=filters,
-            order_by=order_by,
+            filters={"user_id": user_id},
+            keys=("created_at", "conversation_id"),
             limit=limit,
-            offset=offset
+            cursor=cursor
         )
 
-        # Extract conversation IDs from the result
-        conversation_ids = [row["conversation_id"] for row in result]
-
-        return {"conversation_ids": conversation_ids}
+        return {
+            "conversation_ids": [row["conversation_id"] for row in page["rows"]],
+            "next_cursor": page["next_cursor"]
+        }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -159,8 +281,40 @@ async def get_user_conversations(user_id, limit = None, offset = None):
         )
 
 
+async def provision_notion(user_id: str, row: dict):
+    """
+    Background half of the Notion onboarding: create the Conversation
+    History page and Todo List database and record their IDs.
+    """
+    provisioning_status.set(user_id, {"state": "running", "error": None})
+    try:
+        notion_client = get_notion_client(row['access_token'])
+        conversations_page_id, todo_page_id = await init_notion(notion_client)
+
+        result = await async_insert_data(
+            table="notion_integrations",
+            data={
+                **row,
+                "conversations_page_id": conversations_page_id,
+                "todo_page_id": todo_page_id
+            },
+            upsert=True
+        )
+        if not result['success']:
+            raise Exception(f"Failed to store Notion integration: {result['error']}")
+
+        refresh_integration(user_id, "notion", (result['data'] or [None])[0])
+        provisioning_status.set(user_id, {"state": "ready", "error": None})
+        logger.info(f"Provisioned Notion workspace for {user_id}")
+
+    except Exception as e:
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"Error provisioning Notion for {user_id}: {error}")
+        provisioning_status.set(user_id, {"state": "failed", "error": error})
+
+
 @app.post("/api/py/notion/callback")
-async def notion_callback(request: Request):
+async def notion_callback(request: Request, background_tasks: BackgroundTasks):
     try:
         data = await request.json()
         code = data.get('code')
@@ -200,7 +354,7 @@ async def notion_callback(request: Request):
             logger.info(f"Request payload: {payload}")
 
             response = await client.post(
-                'https://api.notion.com/v1/oauth/token',
+                f'{NOTION_BASE_URL}/v1/oauth/token',
                 headers=headers,
                 json=payload,
                 auth=(notion_client_id, notion_client_secret)
@@ -229,21 +383,20 @@ async def notion_callback(request: Request):
             logger.info("Successfully obtained Notion access token")
 
             print(response_data)
-            notion_client = Client(auth=response_data['access_token'])
-            conversations_page_id, todo_page_id = init_notion(notion_client)
-            # Store the access token in the database
-            result = insert_data(
-                supabase=supabase,
+            # Store the access token; the workspace structure is provisioned
+            # in the background so the browser is not kept waiting
+            row = {
+                "user_id": user_id,
+                "access_token": response_data['access_token'],
+                "workspace_id": response_data['workspace_id'],
+                "workspace_name": response_data.get('workspace_name', ''),
+                "bot_id": response_data['bot_id'],
+                "conversations_page_id": None,
+                "todo_page_id": None
+            }
+            result = await async_insert_data(
                 table="notion_integrations",
-                data={
-                    "user_id": user_id,
-                    "access_token": response_data['access_token'],
-                    "workspace_id": response_data['workspace_id'],
-                    "workspace_name": response_data.get('workspace_name', ''),
-                    "bot_id": response_data['bot_id'],
-                    "conversations_page_id" : conversations_page_id,
-                    "todo_page_id": todo_page_id
-                },
+                data=row,
                 upsert=True
             )
 
@@ -254,8 +407,13 @@ async def notion_callback(request: Request):
                     status_code=500,
                     detail="Failed to store Notion integration"
                 )
+            refresh_integration(user_id, "notion", (result['data'] or [None])[0])
+            todo_mirrors.reset(user_id)
 
-            return {"status": "success"}
+            provisioning_status.set(user_id, {"state": "pending", "error": None})
+            background_tasks.add_task(provision_notion, user_id, row)
+
+            return {"status": "success", "provisioning": "pending"}
 
     except HTTPException as he:
         raise he
@@ -267,22 +425,37 @@ async def notion_callback(request: Request):
         )
 
 
+@app.get("/api/py/notion/provisioning/{user_id}")
+async def get_notion_provisioning(user_id: str):
+    """
+    Progress of the background workspace setup started by the callback:
+    pending, running, ready or failed. Falls back to the stored integration
+    when this process has no record (e.g. after a restart).
+    """
+    status = provisioning_status.get(user_id)
+    if status is not None:
+        return status
+
+    result = await get_integration(user_id, "notion")
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No Notion integration found"
+        )
+    if result.get("todo_page_id") and result.get("conversations_page_id"):
+        return {"state": "ready", "error": None}
+    return {"state": "pending", "error": None}
+
+
 @app.get("/api/py/notion/status/{user_id}")
+@coalesce("notion_status")
 async def get_notion_status(user_id: str):
     try:
         # Query the database for notion integration
-        result = select_data(
-            supabase=supabase,
-            table="notion_integrations",
-            columns="*",
-            filters={"user_id": user_id},
-            limit=1
-        )
+        result = await get_integration(user_id, "notion")
 
-        logger.info(f"Notion status query result: {result}")
-
-        is_connected = len(result) > 0
-        workspace_name = result[0].get('workspace_name', '') if is_connected else None
+        is_connected = result is not None
+        workspace_name = result.get('workspace_name', '') if is_connected else None
 
         return {
             "is_connected": is_connected,
@@ -297,42 +470,11 @@ async def get_notion_status(user_id: str):
         )
 
 
-@app.post("/api/py/conversations")
-async def create_conversation(request: Request):
-    try:
-        data = await request.json()
-        user_id = data.get('user_id')
-        conversation_id = data.get('conversation_id')
-
-        # Insert the conversation into your database
-        result = insert_data(
-            supabase=supabase,
-            table="conversations",
-            data={"user_id": user_id, "conversation_id": conversation_id}
-        )
-
-        if not result['success']:
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to create conversation record"
-            )
-
-        return {"status": "success"}
-
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Server error: {str(e)}"
-        )
-
 @app.get("/api/py/conversations/latest/{user_id}")
 async def get_latest_conversation(user_id: str):
     try:
         # Query the database for the latest conversation
-        result = select_data(
-            supabase=supabase,
+        result = await async_select_data(
             table="conversations",
             columns="*",
             filters={"user_id": user_id},
@@ -373,8 +515,7 @@ async def google_calendars(request: Request):
         print(user_id)
         print(access_token)
         # write to supabase table google_calendars
-        result = insert_data(
-            supabase=supabase,
+        result = await async_insert_data(
             table="google_integrations",
             data={"user_id": user_id, "access_token": access_token}
         )
@@ -387,6 +528,8 @@ async def google_calendars(request: Request):
                 status_code=500,
                 detail="Failed to store Google integration"
             )
+        refresh_integration(user_id, "google", (result['data'] or [None])[0])
+        calendar_sync.reset(user_id)
 
 
         return {"success": True}
@@ -404,15 +547,14 @@ async def google_calendars(request: Request):
 async def get_google_calendars(user_id: str):
     try:
         # Query the database for Google integration
-        result = select_data(
-            supabase=supabase,
-            table="google_integrations",
-            columns="*",
-            filters={"user_id": user_id},
-            limit=1
-        )
+        result = await get_integration(user_id, "google")
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail="No Google integration found"
+            )
 
-        return result[0]
+        return result
 
     except HTTPException as he:
         raise he
@@ -422,23 +564,115 @@ async def get_google_calendars(user_id: str):
             detail=f"Server error: {str(e)}"
         )
 
+async def get_notion_integration(user_id: str, require: Optional[str] = None):
+    result = await get_integration(user_id, "notion")
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No Notion integration found"
+        )
+    if require and not result.get(require):
+        raise HTTPException(
+            status_code=409,
+            detail="Notion workspace is still being set up"
+        )
+    return result
+
+
+@app.get("/api/py/cache/stats")
+async def cache_stats():
+    return {
+        "credentials": credential_cache.stats(),
+        "singleflight": single_flight.stats()
+    }
+
+
+@app.get("/api/py/outbound/stats")
+async def outbound_stats():
+    return outbound.stats()
+
+
+def collect_metrics():
+    """Copy the counters kept by caches, coalescing, outbound and outbox into gauges."""
+    for stat, value in credential_cache.stats().items():
+        metrics.cache_stats.set("credentials", stat, value=value)
+    for route, counters in single_flight.stats()["routes"].items():
+        for role, value in counters.items():
+            metrics.singleflight_calls.set(route, role, value=value)
+    for upstream, counters in outbound.stats().items():
+        for stat, value in counters.items():
+            metrics.outbound_calls.set(upstream, stat, value=value)
+    for status, count in outbox_workers.outbox.counts().items():
+        metrics.outbox_jobs.set(status, value=count)
+
+
+metrics.registry.add_collector(collect_metrics)
+
+
+@app.get("/api/py/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint."""
+    body = await asyncio.to_thread(metrics.registry.render)
+    return Response(content=body, media_type="text/plain; version=0.0.4")
+
+
+async def stream_ndjson(items):
+    """Serialize an async iterator as newline-delimited JSON."""
+    try:
+        async for item in items:
+            yield json_dumps(item) + b"\n"
+    except HTTPException as he:
+        # Headers are already sent, so report the failure in-band
+        yield json_dumps({"error": he.detail}) + b"\n"
+
+
 @app.get("/api/py/get-todo-list/{user_id}")
-async def get_todo_list(user_id):
+@coalesce("todo_list", skip=lambda params: params.get("stream"))
+async def get_todo_list(
+    user_id,
+    stream: bool = False,
+    page_size: int = Query(100, ge=1, le=100),
+    limit: Optional[int] = Query(None, ge=1),
+    max_age: float = Query(TODO_MIRROR_MAX_AGE, ge=0),
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Todo items from the local mirror, synced first if it is older than
+    max_age seconds. stream=true bypasses the mirror and streams live
+    Notion results as NDJSON. fields (e.g. "name,status,due_date") trims
+    each item to its id and those fields; when streaming, only the
+    matching Notion properties are fetched.
+
+    Mirror responses carry an ETag derived from the pages' last_edited_time
+    and values; a request whose If-None-Match still matches gets 304 with
+    no body.
+    """
     try:
-        result = select_data(
-            supabase=supabase,
-            table="notion_integrations",
-            columns="access_token,todo_page_id",
-            filters={"user_id": user_id},
-            limit=1
-        )
-        todo_page_id = result[0]["todo_page_id"]
+        selected = parse_fields(fields, TODO_PROPERTIES)
+        result = await get_notion_integration(user_id, require="todo_page_id")
+        todo_page_id = result["todo_page_id"]
         
-        notion_client = Client(auth=result[0]['access_token'])
-        results = get_todo_items(notion_client,todo_page_id)
-        return results
+        notion_client = get_notion_client(result['access_token'])
+        if stream:
+            return StreamingResponse(
+                stream_ndjson(iter_todo_items(notion_client, todo_page_id, page_size, limit, selected)),
+                media_type="application/x-ndjson"
+            )
+
+        mirror = await todo_mirrors.get_fresh(user_id, todo_page_id, notion_client, max_age)
+        items = mirror.items(limit)
+
+        def content():
+            if selected is None:
+                return items
+            return [project(item, selected) for item in items]
+
+        return conditional_response(content, mirror.etag(items, selected), if_none_match)
     
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -456,20 +690,15 @@ async def add_todo_list(request: Request):
         print(data)
         print('--------------------------------')
         user_id = data["user_id"]
-        result = select_data(
-            supabase=supabase,
-            table="notion_integrations",
-            columns="access_token,todo_page_id",
-            filters={"user_id": user_id},
-            limit=1
-        )
+        result = await get_notion_integration(user_id, require="todo_page_id")
         print(result)
         print('--------------------------------')
-        todo_page_id = result[0]["todo_page_id"]
+        todo_page_id = result["todo_page_id"]
         
-        notion_client = Client(auth=result[0]['access_token'])
+        notion_client = get_notion_client(result['access_token'])
 
-        results = add_todo_item(notion_client,todo_page_id, data["name"],data["priority"],data["due_date"])
+        results = await add_todo_item(notion_client,todo_page_id, data["name"],data["priority"],data["due_date"])
+        todo_mirrors.record(user_id, todo_page_id, results)
         if results:
             res = {
                 "success": True,
@@ -494,28 +723,185 @@ async def add_todo_list(request: Request):
             detail=f"Server error: {str(e)}"
         )
     
-@app.post("/api/py/add-conv-hist")
-async def add_conv_hist(request: Request):
+class TodoItem(BaseModel):
+    name: str
+    priority: str = "Low"
+    due_date: Optional[str] = None
+
+
+class TodoBatch(BaseModel):
+    user_id: str
+    items: List[TodoItem] = Field(min_length=1, max_length=MAX_TODO_BATCH)
+
+
+@app.post("/api/py/add-todo-list/batch")
+async def add_todo_list_batch(batch: TodoBatch):
+    """
+    Create several todo items at once. Items are written concurrently, capped
+    by the token's concurrency limit and the outbound rate limiter, and each one
+    reports its own outcome so a partial failure does not hide the rest.
+    """
     try:
-        data = await request.json()
-        print("here")
-        print(data)
-        user_id = data["user_id"]
-        result = select_data(
-            supabase=supabase,
-            table="notion_integrations",
-            columns="access_token,conversations_page_id",
-            filters={"user_id": user_id},
-            limit=1
+        result = await get_notion_integration(batch.user_id, require="todo_page_id")
+        todo_page_id = result["todo_page_id"]
+
+        notion_client = get_notion_client(result['access_token'])
+
+        async def add_one(index, item):
+            async with notion_client.semaphore:
+                try:
+                    page = await add_todo_item(notion_client, todo_page_id, item.name, item.priority, item.due_date)
+                except HTTPException as he:
+                    return {"index": index, "success": False, "error": he.detail}
+            todo_mirrors.record(batch.user_id, todo_page_id, page)
+            return {"index": index, "success": True, "id": page["id"]}
+
+        results = await asyncio.gather(*(
+            add_one(index, item) for index, item in enumerate(batch.items)
+        ))
+        failed = sum(1 for r in results if not r["success"])
+
+        return {
+            "success": failed == 0,
+            "created": len(results) - failed,
+            "failed": failed,
+            "results": results
+        }
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
         )
-        conversations_page_id = result[0]["conversations_page_id"]
-        
-        notion_client = Client(auth=result[0]['access_token'])
 
-        results = create_conv_page(notion_client,conversations_page_id, data["title"], data["content"])
 
-        return results
-    
+@app.get("/api/py/schedule/{user_id}")
+async def get_schedule(
+    user_id: str,
+    days: int = Query(SCHEDULE_HORIZON_DAYS, ge=1, le=SCHEDULE_MAX_HORIZON_DAYS),
+    timezone: str = "UTC",
+    duration: int = Query(SCHEDULE_TASK_MINUTES, ge=5, le=480),
+    buffer: int = Query(SCHEDULE_BUFFER_MINUTES, ge=0, le=120),
+    day_start: int = Query(SCHEDULE_DAY_START, ge=0, le=23),
+    day_end: int = Query(SCHEDULE_DAY_END, ge=1, le=23),
+    weekends: bool = False,
+    source: str = Query("cache", pattern="^(cache|freebusy)$"),
+    max_age: float = Query(TODO_MIRROR_MAX_AGE, ge=0)
+):
+    """
+    Propose calendar blocks for the user's pending todos. Busy time comes
+    from the synced calendar store (source=cache) or Google's freeBusy API
+    (source=freebusy). Nothing is written; send the proposals to
+    /api/py/schedule/commit to create the events.
+    """
+    try:
+        try:
+            tz = ZoneInfo(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Unknown timezone: {timezone}")
+        if day_end <= day_start:
+            raise HTTPException(status_code=400, detail="day_end must be after day_start")
+
+        start, end = planning_window(days, tz)
+        integration = await get_notion_integration(user_id, require="todo_page_id")
+        notion_client = get_notion_client(integration['access_token'])
+
+        async def get_busy():
+            if source == "freebusy":
+                service = await get_calendar_service(user_id)
+                return await asyncio.to_thread(service.free_busy, start, end)
+            store = await calendar_sync.get_fresh_store(
+                user_id,
+                lambda: get_calendar_service(user_id),
+                max_age=max_age
+            )
+            return busy_from_events(store.between(start.timestamp(), end.timestamp()))
+
+        mirror, busy = await asyncio.gather(
+            todo_mirrors.get_fresh(user_id, integration["todo_page_id"], notion_client, max_age),
+            get_busy()
+        )
+
+        planning_started = time.perf_counter()
+        plan = plan_schedule(
+            mirror.items(),
+            busy,
+            start,
+            end,
+            tz,
+            duration_minutes=duration,
+            buffer_minutes=buffer,
+            day_start=day_start,
+            day_end=day_end,
+            weekends=weekends
+        )
+        return {
+            **plan,
+            "source": source,
+            "timezone": timezone,
+            "window": {"start": start.isoformat(), "end": end.isoformat()},
+            "planning_ms": round((time.perf_counter() - planning_started) * 1000, 2)
+        }
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
+        )
+
+
+class ScheduledBlock(BaseModel):
+    todo_id: str
+    name: str
+    start: datetime
+    end: datetime
+
+
+class ScheduleCommit(BaseModel):
+    user_id: str
+    timezone: str = "UTC"
+    proposals: List[ScheduledBlock] = Field(min_length=1, max_length=MAX_SCHEDULE_COMMIT)
+
+
+@app.post("/api/py/schedule/commit")
+async def commit_schedule(commit: ScheduleCommit):
+    """
+    Create calendar events for accepted schedule proposals. The events are
+    created through one batch request and each block reports its own
+    outcome.
+    """
+    try:
+        service = await get_calendar_service(commit.user_id)
+
+        operations = [{
+            "action": "create",
+            "summary": block.name,
+            "start_time": block.start,
+            "end_time": block.end,
+            "description": f"Scheduled from Notion todo {block.todo_id}",
+            "timezone": commit.timezone
+        } for block in commit.proposals]
+        created = await asyncio.to_thread(service.batch_events, operations)
+
+        results = []
+        for index, (block, outcome) in enumerate(zip(commit.proposals, created)):
+            if not outcome["success"]:
+                results.append({"index": index, "todo_id": block.todo_id, "success": False, "error": outcome["error"]})
+                continue
+            calendar_sync.record(commit.user_id, outcome["event"])
+            results.append({"index": index, "todo_id": block.todo_id, "success": True, "event_id": outcome["event"]["id"]})
+        failed = sum(1 for r in results if not r["success"])
+
+        return {
+            "success": failed == 0,
+            "created": len(results) - failed,
+            "failed": failed,
+            "results": results
+        }
 
     except HTTPException as he:
         raise he
@@ -526,4 +912,69 @@ async def add_conv_hist(request: Request):
         )
 
 
+async def save_conv_hist(payload, progress):
+    """
+    Outbox handler: write a saved conversation to the user's Notion.
+
+    The page id and appended batch count are checkpointed after every
+    Notion write, so a retry continues the same page instead of creating
+    a duplicate.
+    """
+    result = await get_notion_integration(payload["user_id"], require="conversations_page_id")
+    conversations_page_id = result["conversations_page_id"]
+
+    notion_client = get_notion_client(result['access_token'])
+
+    async def checkpoint(page_id, batches_done):
+        await progress.save(page_id=page_id, batches_done=batches_done)
+
+    page = await create_conv_page(
+        notion_client, conversations_page_id, payload["title"], payload["content"],
+        page_id=progress.state.get("page_id"),
+        batches_done=progress.state.get("batches_done", 0),
+        on_progress=checkpoint
+    )
+    return {"page_id": page["id"]}
+
+
+outbox_workers.register("conv_hist", save_conv_hist)
+
+
+@app.post("/api/py/add-conv-hist", status_code=202)
+async def add_conv_hist(request: Request):
+    """
+    Accept a conversation save. The request is committed to the durable
+    outbox and written to Notion in the background; poll
+    /api/py/add-conv-hist/{job_id} for the outcome.
+    """
+    try:
+        data = await request.json()
+        job_id = await outbox_workers.submit("conv_hist", {
+            "user_id": data["user_id"],
+            "title": data["title"],
+            "content": data["content"]
+        })
+
+        return {"job_id": job_id, "status": "pending"}
+
+    except KeyError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing required parameter: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
+        )
 
+
+@app.get("/api/py/add-conv-hist/{job_id}")
+async def get_conv_hist_job(job_id: str):
+    job = await asyncio.to_thread(outbox_workers.outbox.get, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+    return job
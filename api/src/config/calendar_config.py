@@ -1,3 +1,4 @@
+import os
 from typing import List
 
 SCOPES: List[str] = [
@@ -8,10 +9,50 @@ SCOPES: List[str] = [
 # Calendar API settings
 CALENDAR_API_VERSION = 'v3'
 CALENDAR_SERVICE_NAME = 'calendar'
+# Overrides the API base URL, e.g. to point at a local stand-in
+CALENDAR_API_ENDPOINT = os.getenv("GOOGLE_CALENDAR_API_ENDPOINT")
 
 # Time format for calendar events
 DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
 
+# Event fields requested from Google (partial response) and served by the
+# API; conference data, reminders, creator and the like are left out
+EVENT_FIELDS = (
+    'id', 'etag', 'status', 'summary', 'description', 'location', 'start', 'end',
+    'attendees', 'organizer', 'htmlLink', 'hangoutLink', 'transparency',
+    'recurringEventId', 'iCalUID', 'updated'
+)
+EVENT_FIELDS_MASK = f"items({','.join(EVENT_FIELDS)})"
+
 # Default calendar settings
 DEFAULT_MAX_RESULTS = 10
-DEFAULT_TIME_ZONE = 'UTC' 
\ No newline at end of file
+DEFAULT_TIME_ZONE = 'UTC'
+
+# Transport and service object reuse
+HTTP_POOL_SIZE = 16
+HTTP_TIMEOUT = 30
+SERVICE_CACHE_SIZE = 256
+SERVICE_CACHE_TTL = 3600
+
+# Batch requests: the Calendar API accepts at most 50 calls per batch
+BATCH_SIZE = 50
+MAX_BATCH_OPERATIONS = 500
+# Extra rounds for batched calls that came back rate limited
+BATCH_RETRIES = 2
+
+# Incremental sync settings
+SYNC_PAGE_SIZE = 2500
+SYNC_LOOKBACK_DAYS = 1
+SYNC_MAX_AGE = 30
+SYNC_MAX_USERS = 1024
+# How often a user's list of selected calendars is re-read during sync
+CALENDAR_LIST_TTL = 300
+
+# Auto-scheduler defaults
+SCHEDULE_HORIZON_DAYS = 7
+SCHEDULE_MAX_HORIZON_DAYS = 31
+SCHEDULE_DAY_START = 9
+SCHEDULE_DAY_END = 18
+SCHEDULE_TASK_MINUTES = 30
+SCHEDULE_BUFFER_MINUTES = 0
+SCHEDULE_GRANULARITY_MINUTES = 15
@@ -0,0 +1,65 @@
+import os
+from typing import Any, Dict, Optional
+
+from api.src.db.supabase import async_select_data
+from api.src.utils import TTLCache
+
+
+# Integration name -> Supabase table holding its per-user credentials
+INTEGRATION_TABLES = {
+    "notion": "notion_integrations",
+    "google": "google_integrations"
+}
+
+# Integration rows change only on (re)connect, which goes through this
+# process and invalidates the entry, so a few minutes of TTL is safe.
+credential_cache = TTLCache(
+    maxsize=int(os.getenv("CREDENTIAL_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("CREDENTIAL_CACHE_TTL", "300"))
+)
+
+
+async def get_integration(user_id: str, integration: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a user's integration row, served from the credential cache when fresh.
+
+    Args:
+        user_id: User ID to fetch credentials for
+        integration: "notion" or "google"
+
+    Returns:
+        The full integration row, or None if the user has not connected it
+    """
+    key = (user_id, integration)
+    row = credential_cache.get(key)
+    if row is not None:
+        return row
+
+    result = await async_select_data(
+        table=INTEGRATION_TABLES[integration],
+        columns="*",
+        filters={"user_id": user_id},
+        limit=1
+    )
+    if not result:
+        # Misses are not cached so a fresh connect is picked up immediately
+        return None
+
+    credential_cache.set(key, result[0])
+    return result[0]
+
+
+def refresh_integration(user_id: str, integration: str, row: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Write-through hook for the integration write paths.
+
+    Args:
+        user_id: User whose credentials changed
+        integration: "notion" or "google"
+        row: The row as written; if omitted the entry is just invalidated
+    """
+    key = (user_id, integration)
+    if row:
+        credential_cache.set(key, row)
+    else:
+        credential_cache.invalidate(key)
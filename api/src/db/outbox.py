@@ -0,0 +1,410 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+
+OUTBOX_PATH = os.getenv(
+    "OUTBOX_PATH",
+    os.path.join(tempfile.gettempdir(), "switch-it-up-outbox.sqlite3")
+)
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+# A running job whose owner has not renewed its claim for this long is
+# presumed dead and may be taken over by another worker
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+# How long a statement waits for another process's write lock before
+# failing with "database is locked"
+OUTBOX_BUSY_TIMEOUT = float(os.getenv("OUTBOX_BUSY_TIMEOUT", "5"))
+RETRYABLE_STATUS = {408, 409, 429}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    claimed_at REAL,
+    progress TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_attempt_at);
+"""
+
+# Columns added after the first release, for databases created before them
+_MIGRATIONS = (
+    ("owner", "TEXT"),
+    ("claimed_at", "REAL"),
+    ("progress", "TEXT"),
+)
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker has taken it over."""
+
+
+class Outbox:
+    """
+    SQLite-backed job table. A job is committed to disk before the caller
+    is acknowledged, so a crash or redeploy never loses an accepted write.
+
+    Job status moves pending -> running -> done, or back to pending with a
+    later next_attempt_at on a retryable failure, or to failed.
+
+    Several processes may share the file. A claim is a lease held by one
+    owner and renewed while the job runs; only a running job whose lease
+    has expired is taken over, and writes from an owner that lost its lease
+    are ignored.
+    """
+
+    def __init__(self, path: str = OUTBOX_PATH):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The database connection, opened on first use rather than at import."""
+        if self._db is None:
+            conn = sqlite3.connect(
+                self.path, timeout=OUTBOX_BUSY_TIMEOUT, check_same_thread=False, isolation_level=None
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in _MIGRATIONS:
+                if column not in columns:
+                    try:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+                    except sqlite3.OperationalError as e:
+                        # Another process added it first
+                        if "duplicate column" not in str(e):
+                            raise
+            self._db = conn
+        return self._db
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Persist a new job and return its id."""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now, now)
+            )
+        return job_id
+
+    def claim(self, owner: str, lease: float = OUTBOX_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the oldest due job, or None.
+
+        A due job is a pending one whose next_attempt_at has passed, or a
+        running one whose lease has expired because its owner died.
+
+        Args:
+            owner: Id of the claiming worker pool
+            lease: Seconds before an unrenewed claim expires
+
+        Returns:
+            dict: The job, with its payload and saved progress decoded
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'pending' AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE status = 'running' "
+                        "AND (claimed_at IS NULL OR claimed_at < ?) LIMIT 1",
+                        (now - lease,)
+                    ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, "
+                        "claimed_at = ?, updated_at = ? WHERE id = ?",
+                        (owner, now, now, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["attempts"] += 1
+        job["owner"] = owner
+        job["payload"] = json.loads(job["payload"])
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else {}
+        return job
+
+    def renew(self, job_id: str, owner: str) -> bool:
+        """Extend the lease on a running job; False if the owner lost it."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET claimed_at = ?, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (now, now, job_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def checkpoint(self, job_id: str, owner: str, progress: Dict[str, Any]) -> None:
+        """
+        Save how far a running job got, renewing its lease.
+
+        Raises:
+            LeaseLost: If another worker has taken the job over
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET progress = ?, claimed_at = ?, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (json.dumps(progress), now, now, job_id, owner)
+            )
+        if cursor.rowcount != 1:
+            raise LeaseLost(job_id)
+
+    def complete(self, job_id: str, owner: str, result: Any = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, last_error = NULL, owner = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ?",
+                (json.dumps(result), time.time(), job_id, owner)
+            )
+
+    def retry(self, job_id: str, owner: str, error: str, delay: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'pending', last_error = ?, next_attempt_at = ?, owner = NULL, "
+                "updated_at = ? WHERE id = ? AND owner = ?",
+                (error, now + delay, now, job_id, owner)
+            )
+
+    def fail(self, job_id: str, owner: str, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', last_error = ?, owner = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ?",
+                (error, time.time(), job_id, owner)
+            )
+
+    def recover(self, lease: float = OUTBOX_LEASE_SECONDS) -> int:
+        """Return running jobs whose lease has expired to the queue."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', owner = NULL, updated_at = ? "
+                "WHERE status = 'running' AND (claimed_at IS NULL OR claimed_at < ?)",
+                (now, now - lease)
+            )
+        return cursor.rowcount
+
+    def release(self, owner: str) -> int:
+        """Requeue the running jobs of an owner that is shutting down."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', owner = NULL, updated_at = ? "
+                "WHERE status = 'running' AND owner = ?",
+                (time.time(), owner)
+            )
+        return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public status view of a job."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, attempts, last_error, result, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class JobProgress:
+    """
+    Progress a handler saves as it goes, so a retried or taken-over job
+    resumes after the last step that completed instead of repeating it.
+    """
+
+    def __init__(self, outbox: Outbox, job: Dict[str, Any]):
+        self.outbox = outbox
+        self.job_id = job["id"]
+        self.owner = job["owner"]
+        self.state: Dict[str, Any] = job["progress"]
+
+    async def save(self, **state) -> None:
+        """
+        Merge state into the saved progress.
+
+        Raises:
+            LeaseLost: If another worker has taken the job over
+        """
+        self.state.update(state)
+        await asyncio.to_thread(self.outbox.checkpoint, self.job_id, self.owner, self.state)
+
+
+Handler = Callable[[Dict[str, Any], JobProgress], Awaitable[Any]]
+
+
+class OutboxWorkerPool:
+    """Background tasks that drain the outbox with retries and backoff."""
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        workers: int = OUTBOX_WORKERS,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS
+    ):
+        self.outbox = outbox
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.owner = uuid.uuid4().hex
+        self.handlers: Dict[str, Handler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: Handler) -> None:
+        """Set the coroutine that processes jobs of the given kind."""
+        self.handlers[kind] = handler
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Durably enqueue a job and nudge an idle worker."""
+        job_id = await asyncio.to_thread(self.outbox.enqueue, kind, payload)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        recovered = await asyncio.to_thread(self.outbox.recover)
+        if recovered:
+            print(f"Outbox: requeued {recovered} interrupted jobs")
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Hand interrupted jobs back now rather than after the lease expires;
+        # their saved progress lets the next owner resume them
+        await asyncio.to_thread(self.outbox.release, self.owner)
+
+    def backoff(self, attempts: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE ** attempts))
+
+    async def _run(self) -> None:
+        errors = 0
+        while True:
+            try:
+                job = await asyncio.to_thread(self.outbox.claim, self.owner)
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), OUTBOX_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await self._process(job)
+                errors = 0
+            except Exception as e:
+                # e.g. another process held the database past the busy
+                # timeout; a job caught mid-update is picked up again once
+                # its lease expires, so keep the worker alive
+                errors += 1
+                print(f"Outbox: worker error: {e}")
+                await asyncio.sleep(self.backoff(errors))
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renew a running job's lease until its owner loses it."""
+        while True:
+            await asyncio.sleep(OUTBOX_LEASE_SECONDS / 3)
+            try:
+                if not await asyncio.to_thread(self.outbox.renew, job_id, self.owner):
+                    return
+            except Exception as e:
+                # Try again on the next beat, well before the lease runs out
+                print(f"Outbox: could not renew the lease on job {job_id}: {e}")
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await asyncio.to_thread(self.outbox.fail, job["id"], self.owner, f"No handler for {job['kind']}")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            result = await handler(job["payload"], JobProgress(self.outbox, job))
+        except asyncio.CancelledError:
+            # Left as 'running'; stop() releases it, or its lease expires
+            raise
+        except LeaseLost:
+            # Another worker owns the job now
+            print(f"Outbox: lost the lease on job {job['id']}")
+            return
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            # Client errors (e.g. no integration) will not fix themselves,
+            # apart from timeouts, conflicts and rate limiting
+            permanent = (
+                isinstance(e, HTTPException)
+                and 400 <= e.status_code < 500
+                and e.status_code not in RETRYABLE_STATUS
+            )
+            if permanent or job["attempts"] >= self.max_attempts:
+                await asyncio.to_thread(self.outbox.fail, job["id"], self.owner, error)
+            else:
+                await asyncio.to_thread(
+                    self.outbox.retry, job["id"], self.owner, error, self.backoff(job["attempts"])
+                )
+            return
+        finally:
+            heartbeat.cancel()
+
+        await asyncio.to_thread(self.outbox.complete, job["id"], self.owner, result)
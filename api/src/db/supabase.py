@@ -1,62 +1,112 @@
 import os
-from supabase import Client
+import json
+import base64
+import asyncio
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
+from api.src.metrics import track_upstream
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
-def insert_data(
-    supabase,
-    table,
-    data,
-    upsert = False,
-    returning = "uuid"
-):
 
-    try:
-        query = supabase.table(table)
-        if upsert:
-            query = query.upsert(data)
-        else:
-            query = query.insert(data)
+# Shared async client. Its PostgREST session is a single httpx.AsyncClient
+# (HTTP/2, keep-alive), so every query reuses the same connection pool.
+_async_client = None
+_async_client_lock = asyncio.Lock()
 
-        # Specify which columns to return
-        # query = query.returning(returning)
+POSTGREST_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
 
-        # Execute the query
-        response = query.execute()
+# Rows per request when writing a list; each chunk is one statement
+WRITE_CHUNK_SIZE = int(os.getenv("SUPABASE_WRITE_CHUNK_SIZE", "500"))
 
-        return {
-            'success': True,
-            'data': response.data,
-            'error': None,
-            'count': len(response.data) if response.data else 0
-        }
 
-    except Exception as e:
-        return {
-            'success': False,
-            'data': None,
-            'error': str(e),
-            'count': 0
-        }
+async def get_async_client() -> "AsyncClient":
+    """
+    Get the shared async Supabase client, creating it on first use.
 
+    Returns:
+        AsyncClient bound to SUPABASE_URL / SUPABASE_KEY
+    """
+    global _async_client
+    if _async_client is None:
+        async with _async_client_lock:
+            if _async_client is None:
+                # Imported here: the supabase SDK (gotrue, storage, realtime)
+                # is one of the slowest imports on a cold start
+                from supabase import AsyncClientOptions, acreate_client
 
-def select_data(
-    supabase,
-    table='conversations',
-    columns = "*",
-    filters = None,
-    order_by = None,
-    limit = None,
-    offset = None
-):
+                _async_client = await acreate_client(
+                    os.getenv("SUPABASE_URL"),
+                    os.getenv("SUPABASE_KEY"),
+                    options=AsyncClientOptions(
+                        postgrest_client_timeout=POSTGREST_TIMEOUT
+                    )
+                )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Close the pooled connections of the shared async client."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.postgrest.aclose()
+        _async_client = None
+
+
+def _build_write_query(query, data, upsert, on_conflict=None):
+    if upsert:
+        return query.upsert(data, on_conflict=on_conflict or "")
+    return query.insert(data)
+
+
+def _write_chunks(data):
+    """A single row as is, or a list split into (offset, rows) chunks."""
+    if isinstance(data, dict):
+        return [(0, data)]
+    return [(start, data[start:start + WRITE_CHUNK_SIZE]) for start in range(0, len(data), WRITE_CHUNK_SIZE)]
+
+
+def _merge_write_results(data, results):
+    """
+    Combine the results of a chunked write. Chunks are written atomically,
+    so a failure is reported for the chunk's whole row range.
+    """
+    if isinstance(data, dict):
+        return results[0]
+    rows, failed = [], []
+    for (start, chunk), result in zip(_write_chunks(data), results):
+        if result['success']:
+            rows.extend(result['data'] or [])
+        else:
+            failed.append({'start': start, 'end': start + len(chunk), 'error': result['error']})
+    return {
+        'success': not failed,
+        'data': rows,
+        'error': failed[0]['error'] if failed else None,
+        'count': len(rows),
+        'failed': failed
+    }
+
+
+RANGE_OPERATORS = ('lt', 'lte', 'gt', 'gte')
 
-    query = supabase.table(table).select(columns)
 
+def _build_select_query(query, filters, order_by, limit, offset, ranges=None):
     # Apply filters if provided
     if filters:
         for key, value in filters.items():
             query = query.eq(key, value)
 
+    # Apply range filters, e.g. {'created_at': {'lt': '2024-01-01'}}
+    if ranges:
+        for column, bounds in ranges.items():
+            for operator, value in bounds.items():
+                if operator not in RANGE_OPERATORS:
+                    raise ValueError(f"Unsupported range operator: {operator}")
+                query = getattr(query, operator)(column, value)
+
     # Apply ordering if provided
     if order_by:
         for column, direction in order_by.items():
@@ -73,11 +123,294 @@ def select_data(
     if offset is not None:
         query = query.offset(offset)
 
+    return query
+
+
+def _write_result(response):
+    return {
+        'success': True,
+        'data': response.data,
+        'error': None,
+        'count': len(response.data) if response.data else 0
+    }
+
+
+def _write_error(e):
+    return {
+        'success': False,
+        'data': None,
+        'error': str(e),
+        'count': 0
+    }
+
+
+def insert_data(
+    supabase,
+    table,
+    data,
+    upsert = False,
+    returning = "uuid",
+    on_conflict = None
+):
+    """
+    Blocking insert/upsert. Kept as a sync shim for call sites that have not
+    moved to `async_insert_data` yet; both share the same query builder and
+    chunking of lists.
+    """
+    def write(rows):
+        try:
+            query = _build_write_query(supabase.table(table), rows, upsert, on_conflict)
+
+            # Specify which columns to return
+            # query = query.returning(returning)
+
+            # Execute the query
+            with track_upstream("supabase", f"{'upsert' if upsert else 'insert'}:{table}"):
+                response = query.execute()
+
+            return _write_result(response)
+
+        except Exception as e:
+            return _write_error(e)
+
+    return _merge_write_results(data, [write(rows) for _, rows in _write_chunks(data)])
+
+
+def select_data(
+    supabase,
+    table='conversations',
+    columns = "*",
+    filters = None,
+    order_by = None,
+    limit = None,
+    offset = None,
+    ranges = None
+):
+    """
+    Blocking select. Kept as a sync shim for call sites that have not moved
+    to `async_select_data` yet; both share the same query builder.
+    """
+    try:
+        query = _build_select_query(
+            supabase.table(table).select(columns),
+            filters, order_by, limit, offset, ranges
+        )
+
+        with track_upstream("supabase", f"select:{table}"):
+            response = query.execute()
+        return response.data
+
+    except Exception as e:
+        print(f"Error executing query: {str(e)}")
+        return []
+
+
+async def async_insert_data(
+    table,
+    data,
+    upsert = False,
+    returning = "uuid",
+    supabase = None,
+    on_conflict = None
+):
+    """
+    Insert or upsert rows without blocking the event loop.
+
+    A list of rows is written as multi-row statements of up to
+    WRITE_CHUNK_SIZE rows, sent concurrently.
+
+    Args:
+        table: Table name
+        data: Row to write, or a list of rows
+        upsert: Use upsert instead of insert
+        returning: Unused, kept for parity with `insert_data`
+        supabase: AsyncClient to use (defaults to the shared pooled client)
+        on_conflict: Comma separated unique columns an upsert merges on
+            (defaults to the primary key)
+
+    Returns:
+        dict: {'success', 'data', 'error', 'count'} as for `insert_data`.
+        For a list, also 'failed': [{'start', 'end', 'error'}] row ranges
+        of chunks that were not written.
+    """
+    async def write(rows):
+        try:
+            query = _build_write_query(supabase.table(table), rows, upsert, on_conflict)
+            with track_upstream("supabase", f"{'upsert' if upsert else 'insert'}:{table}"):
+                response = await query.execute()
+
+            return _write_result(response)
+
+        except Exception as e:
+            return _write_error(e)
+
     try:
-        response = query.execute()
+        if supabase is None:
+            supabase = await get_async_client()
+    except Exception as e:
+        return _write_error(e)
+
+    results = await asyncio.gather(*(write(rows) for _, rows in _write_chunks(data)))
+    return _merge_write_results(data, results)
+
+
+async def async_select_data(
+    table='conversations',
+    columns = "*",
+    filters = None,
+    order_by = None,
+    limit = None,
+    offset = None,
+    supabase = None,
+    ranges = None
+):
+    """
+    Select rows without blocking the event loop.
+
+    Args:
+        table: Table name
+        columns: Comma separated columns to return
+        filters: {column: value} equality filters
+        order_by: {column: 'asc' | 'desc'}
+        limit: Maximum number of rows
+        offset: Number of rows to skip
+        supabase: AsyncClient to use (defaults to the shared pooled client)
+        ranges: {column: {'lt' | 'lte' | 'gt' | 'gte': value}} range filters
+
+    Returns:
+        list: Matching rows, or [] on error
+    """
+    try:
+        if supabase is None:
+            supabase = await get_async_client()
+        query = _build_select_query(
+            supabase.table(table).select(columns),
+            filters, order_by, limit, offset, ranges
+        )
+        with track_upstream("supabase", f"select:{table}"):
+            response = await query.execute()
         return response.data
 
     except Exception as e:
         print(f"Error executing query: {str(e)}")
         return []
 
+
+def encode_cursor(row: Dict[str, Any], keys: Tuple[str, str]) -> str:
+    """Opaque pagination cursor holding a row's sort key."""
+    raw = json.dumps([row[key] for key in keys], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def timestamp_key(value: Any) -> str:
+    """Cursor component for a timestamp column."""
+    if not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
+
+def string_key(value: Any) -> str:
+    """Cursor component for a text column."""
+    if not isinstance(value, str) or not value:
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def decode_cursor(
+    cursor: str,
+    key_types: Tuple[Callable[[Any], Any], Callable[[Any], Any]] = (timestamp_key, string_key)
+) -> List[Any]:
+    """
+    Sort key from a cursor made by `encode_cursor`.
+
+    Args:
+        cursor: Cursor string
+        key_types: Validator for each key component; raises ValueError on a bad value
+
+    Raises:
+        ValueError: If the cursor is malformed or a component has the wrong type
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list) or len(key) != 2:
+        raise ValueError("Invalid cursor")
+    try:
+        return [check(value) for check, value in zip(key_types, key)]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+async def async_select_page(
+    table,
+    columns = "*",
+    filters = None,
+    keys: Tuple[str, str] = ('created_at', 'id'),
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    supabase = None,
+    key_types: Tuple[Callable[[Any], Any], Callable[[Any], Any]] = (timestamp_key, string_key)
+) -> Dict[str, Any]:
+    """
+    Keyset pagination, newest first, over a (sort column, unique column) key.
+
+    Each page seeks past the previous page's last key instead of counting
+    an offset, so deep pages cost the same as the first. Rows after the
+    cursor are the ones sharing its sort value with a smaller unique value,
+    plus every row with a smaller sort value; the two seeks run
+    concurrently.
+
+    Args:
+        table: Table name
+        columns: Comma separated columns to return (the keys are added)
+        filters: {column: value} equality filters
+        keys: (sort column, unique tiebreaker column)
+        limit: Page size
+        cursor: next_cursor of the previous page, or None for the first page
+        supabase: AsyncClient to use (defaults to the shared pooled client)
+        key_types: Validators for the cursor's (sort, unique) values
+
+    Returns:
+        dict: {'rows', 'next_cursor'}; next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    sort_column, unique_column = keys
+    if columns != "*":
+        columns = ",".join(dict.fromkeys(columns.split(",") + list(keys)))
+    order_by = {sort_column: 'desc', unique_column: 'desc'}
+    filters = filters or {}
+
+    # One extra row tells whether there is a next page
+    if cursor is None:
+        rows = await async_select_data(
+            table, columns, filters=filters, order_by=order_by, limit=limit + 1, supabase=supabase
+        )
+    else:
+        sort_value, unique_value = decode_cursor(cursor, key_types)
+        ties, older = await asyncio.gather(
+            async_select_data(
+                table, columns,
+                filters={**filters, sort_column: sort_value},
+                ranges={unique_column: {'lt': unique_value}},
+                order_by={unique_column: 'desc'},
+                limit=limit + 1,
+                supabase=supabase
+            ),
+            async_select_data(
+                table, columns,
+                filters=filters,
+                ranges={sort_column: {'lt': sort_value}},
+                order_by=order_by,
+                limit=limit + 1,
+                supabase=supabase
+            )
+        )
+        rows = ties + older
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1], keys) if len(rows) > limit else None
+    return {'rows': page, 'next_cursor': next_cursor}
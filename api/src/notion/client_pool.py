@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from notion_client import AsyncClient
+from notion_client.client import ClientOptions
+
+from api.src.metrics import track_upstream
+from api.src.services.outbound import outbound
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+NOTION_BASE_URL = os.getenv("NOTION_BASE_URL", "https://api.notion.com")
+NOTION_TIMEOUT_MS = int(os.getenv("NOTION_TIMEOUT_MS", "30000"))
+NOTION_MAX_CONCURRENCY = int(os.getenv("NOTION_MAX_CONCURRENCY", "3"))
+
+# Shared by every client. Without it the SDK attaches a new console handler
+# to the "notion_client" logger for each client it builds.
+logger = logging.getLogger("notion_client")
+
+
+def operation_name(path: str) -> str:
+    """Collapse ids in a Notion API path, e.g. databases/{id}/query."""
+    segments = path.strip("/").split("/")
+    return "/".join(segment if i % 2 == 0 else "{id}" for i, segment in enumerate(segments))
+
+
+class PooledNotionClient(AsyncClient):
+    """
+    Notion AsyncClient that sends its token per request instead of setting it
+    on the shared httpx client, so many tokens can share one transport.
+    Every request goes through the shared outbound rate limiter, and the
+    client carries the token's concurrency cap for fan-out.
+    """
+
+    def __init__(self, auth_token: str, transport: httpx.AsyncClient):
+        self.auth_token = auth_token
+        self.semaphore = asyncio.Semaphore(NOTION_MAX_CONCURRENCY)
+        super().__init__(
+            options=ClientOptions(
+                base_url=NOTION_BASE_URL,
+                timeout_ms=NOTION_TIMEOUT_MS,
+                logger=logger
+            ),
+            client=transport
+        )
+
+    def _build_request(self, method, path, query=None, body=None, auth=None):
+        return super()._build_request(method, path, query, body, auth or self.auth_token)
+
+    async def request(self, path, method, query=None, body=None, auth=None):
+        # Reads (including the POST query/search endpoints) are safe to
+        # retry; creates and appends are only retried after a 429
+        idempotent = method == "GET" or path == "search" or path.endswith("/query")
+        operation = f"{method} {operation_name(path)}"
+
+        async def send():
+            with track_upstream("notion", operation):
+                return await super(PooledNotionClient, self).request(path, method, query, body, auth)
+
+        return await outbound.call("notion", auth or self.auth_token, send, idempotent=idempotent)
+
+
+class NotionClientPool:
+    """Registry of Notion clients keyed by access token."""
+
+    def __init__(self, max_clients: int = 1024, idle_timeout: float = 600.0):
+        """
+        Args:
+            max_clients: Maximum number of registered tokens
+            idle_timeout: Seconds after which an unused client is evicted
+        """
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self._clients: Dict[str, Tuple[PooledNotionClient, float]] = {}
+        self._transport: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def transport(self) -> httpx.AsyncClient:
+        """The keep-alive connection pool shared by every client."""
+        if self._transport is None or self._transport.is_closed:
+            self._transport = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=60.0
+                )
+            )
+        return self._transport
+
+    def get(self, auth_token: str) -> PooledNotionClient:
+        """
+        Get the client for a token, creating it on first use.
+
+        Args:
+            auth_token: Notion access token
+
+        Returns:
+            PooledNotionClient bound to the shared transport
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(auth_token)
+            if entry is None:
+                if len(self._clients) >= self.max_clients:
+                    oldest = min(self._clients, key=lambda token: self._clients[token][1])
+                    del self._clients[oldest]
+                client = PooledNotionClient(auth_token, self.transport)
+            else:
+                client = entry[0]
+            self._clients[auth_token] = (client, now)
+            return client
+
+    def _evict_idle(self, now: float) -> None:
+        expired = [
+            token for token, (_, last_used) in self._clients.items()
+            if now - last_used > self.idle_timeout
+        ]
+        for token in expired:
+            del self._clients[token]
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def aclose(self) -> None:
+        """Drop all clients and close the shared transport."""
+        with self._lock:
+            self._clients.clear()
+            transport, self._transport = self._transport, None
+        if transport is not None:
+            await transport.aclose()
+
+
+notion_pool = NotionClientPool()
+
+
+def get_notion_client(auth_token: str) -> PooledNotionClient:
+    """Get the pooled Notion client for an access token."""
+    return notion_pool.get(auth_token)
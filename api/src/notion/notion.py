@@ -1,79 +1,142 @@
+import re
+import asyncio
+import itertools
 from fastapi import HTTPException
 
+from api.src.utils import TTLCache, project
 
-def init_notion(notion):
 
+# Notion request limits
+MAX_RICH_TEXT_LENGTH = 2000
+MAX_BLOCKS_PER_REQUEST = 100
+# Keeps a request body well under Notion's 500KB payload limit
+MAX_CHARS_PER_REQUEST = 100_000
+
+# Todo item fields and the database properties they are read from
+TODO_PROPERTIES = {
+    "name": "Name",
+    "status": "Status",
+    "priority": "Priority",
+    "due_date": "Due Date"
+}
+
+# database_id -> {property name: property id}. filter_properties only
+# accepts ids, and a database's schema rarely changes.
+_property_ids = TTLCache(maxsize=1024, ttl=3600)
+
+
+async def find_parent_page(notion):
+    """
+    Get the ID of a page the integration can write under. Only the first
+    search result is needed, so only one is requested.
+    """
     try:
-        structure = {}
-        parent_id = get_all_pages(notion)[0]["id"]
-        # Create Conversation History page
-        parent = {"page_id": parent_id}
-        
-        # Create the Conversation History page with basic template
-        conversation_page = notion.pages.create(
-            parent=parent,
-            properties={
-                "title": {
-                    "title": [
+        response = await notion.search(
+            filter={"property": "object", "value": "page"},
+            page_size=1
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not response.get("results"):
+        raise HTTPException(
+            status_code=400,
+            detail="No Notion page was shared with the integration"
+        )
+    return response["results"][0]["id"]
+
+
+async def create_conversations_page(notion, parent):
+    """Create the Conversation History page and return its ID."""
+    conversation_page = await notion.pages.create(
+        parent=parent,
+        properties={
+            "title": {
+                "title": [
+                    {
+                        "text": {
+                            "content": "Conversation History"
+                        }
+                    }
+                ]
+            }
+        },
+        children=[
+            {
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {
+                    "rich_text": [
                         {
                             "text": {
-                                "content": "Conversation History"
+                                "content": "This is a page with your conversation history with SwitchItUp"
                             }
                         }
                     ]
                 }
+            }
+        ]
+    )
+    return conversation_page["id"]
+
+
+async def create_todo_database(notion, parent):
+    """Create the Todo List database and return its ID."""
+    todo_db = await notion.databases.create(
+        parent=parent,
+        title=[{
+            "text": {
+                "content": "Todo List"
+            }
+        }],
+        properties={
+            "Name": {
+                "title": {}
             },
-            children=[
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "text": {
-                                    "content": "This is a page with your conversation history with SwitchItUp"
-                                }
-                            }
-                        ]
-                    }
-                }
-            ]
-        )
-        structure["conversation_page_id"] = conversation_page["id"]
-
-        # Create Todo List database
-        todo_db = notion.databases.create(
-            parent=parent,
-            title=[{
-                "text": {
-                    "content": "Todo List"
-                }
-            }],
-            properties={
-                "Name": {
-                    "title": {}
-                },
-                "Status": {
-                    "checkbox": {}
-                },
-                "Priority": {
-                    "select": {
-                        "options": [
-                            {"name": "High", "color": "red"},
-                            {"name": "Medium", "color": "yellow"},
-                            {"name": "Low", "color": "blue"}
-                        ]
-                    }
-                },
-                "Due Date": {
-                    "date": {}
+            "Status": {
+                "checkbox": {}
+            },
+            "Priority": {
+                "select": {
+                    "options": [
+                        {"name": "High", "color": "red"},
+                        {"name": "Medium", "color": "yellow"},
+                        {"name": "Low", "color": "blue"}
+                    ]
                 }
+            },
+            "Due Date": {
+                "date": {}
             }
+        }
+    )
+    return todo_db["id"]
+
+
+async def init_notion(notion):
+    """
+    Create the Conversation History page and Todo List database under the
+    first shared page. Both are created concurrently.
+
+    Args:
+        notion: Notion AsyncClient instance
+
+    Returns:
+        tuple: (conversations_page_id, todo_db_id)
+    """
+    parent = {"page_id": await find_parent_page(notion)}
+
+    try:
+        conversations_page_id, todo_db_id = await asyncio.gather(
+            create_conversations_page(notion, parent),
+            create_todo_database(notion, parent)
         )
-        structure["todo_db_id"] = todo_db["id"]
+        return conversations_page_id, todo_db_id
 
-        
-        return structure["conversation_page_id"],structure["todo_db_id"]
+    except HTTPException:
+        raise
 
     except Exception as e:
         raise HTTPException(
@@ -81,85 +144,136 @@ def init_notion(notion):
             detail=f"Failed to initialize structure: {str(e)}"
         )
 
-def get_all_pages(notion):
-    """Get all pages"""
-    try:
-        response = notion.search(
-            filter={"property": "object", "value": "page"}
-        ).get("results", [])
-        
-        pages = []
-        for page in response:
-            try:
-                # Safely get title with multiple fallbacks
-                title = "Untitled"
-                if "properties" in page and "title" in page["properties"]:
-                    title_prop = page["properties"]["title"]
-                    if "title" in title_prop and title_prop["title"]:
-                        try:
-                            title = title_prop["title"][0]["text"]["content"]
-                        except (KeyError, IndexError):
-                            title = "Untitled"
-                
-                page_data = {
-                    "id": page["id"]
-                }
-                pages.append(page_data)
-            except Exception as page_error:
-                # Log the error but continue processing other pages
-                print(f"Error processing page: {str(page_error)}")
-                continue
-        
-        return pages
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
-def get_todo_items(notion, database_id):
+def parse_todo_item(item):
+    """
+    Convert a Todo List database page into a todo item dict. Properties
+    left out of the response (see `todo_property_ids`) get their defaults.
+    """
+    properties = item["properties"]
+    title = properties.get("Name", {}).get("title")
+    priority = properties.get("Priority", {}).get("select")
+    due_date = properties.get("Due Date", {}).get("date")
+    return {
+        "id": item["id"],
+        "name": title[0]["text"]["content"] if title else "",
+        "status": properties.get("Status", {}).get("checkbox", False),
+        "priority": priority["name"] if priority else "Low",
+        "due_date": due_date["start"] if due_date else None
+    }
+
+
+async def todo_property_ids(notion, database_id, fields=None):
+    """
+    Property ids to pass as filter_properties so Notion returns only the
+    properties behind the given todo fields, leaving out any other columns
+    the user added to the database.
+
+    Args:
+        notion: Notion AsyncClient instance
+        database_id: ID of the todo database
+        fields: Todo item fields (keys of TODO_PROPERTIES); None for all
+
+    Returns:
+        list: Property ids, or None to request every property when the
+        schema could not be read
+    """
+    ids = _property_ids.get(database_id)
+    if ids is None:
+        try:
+            database = await notion.databases.retrieve(database_id=database_id)
+        except Exception as e:
+            print(f"Could not read todo database schema, requesting all properties: {str(e)}")
+            return None
+        ids = {name: prop["id"] for name, prop in database["properties"].items()}
+        _property_ids.set(database_id, ids)
+
+    names = [TODO_PROPERTIES[field] for field in (fields or TODO_PROPERTIES) if field in TODO_PROPERTIES]
+    return [ids[name] for name in names if name in ids]
+
+
+async def iter_todo_pages(notion, database_id, page_size=100, limit=None, filter=None, properties=None):
     """
-    Get all items from the todo list
+    Iterate over raw Todo List database pages, following Notion's
+    pagination cursor. Pages are yielded as each batch of results arrives.
     
     Args:
-        notion: Notion client instance
+        notion: Notion AsyncClient instance
         database_id: ID of the todo database
+        page_size: Items requested per Notion query (max 100)
+        limit: Stop after this many pages (None for all)
+        filter: Optional Notion query filter
+        properties: Optional property ids to return (filter_properties)
     
-    Returns:
-        list: List of todo items
+    Yields:
+        dict: Notion page object
     """
-    try:
-        response = notion.databases.query(
-            database_id=database_id,
-            sorts=[{
+    cursor = None
+    count = 0
+    while True:
+        query = {
+            "database_id": database_id,
+            "sorts": [{
                 "property": "Priority",
                 "direction": "descending"
-            }]
-        )
-        
-        todo_items = []
-        for item in response["results"]:
-            todo_item = {
-                "id": item["id"],
-                "name": item["properties"]["Name"]["title"][0]["text"]["content"] if item["properties"]["Name"]["title"] else "",
-                "status": item["properties"]["Status"]["checkbox"],
-                "priority": item["properties"]["Priority"]["select"]["name"] if item["properties"]["Priority"]["select"] else "Low",
-                "due_date": item["properties"]["Due Date"]["date"]["start"] if item["properties"]["Due Date"]["date"] else None
-            }
-            todo_items.append(todo_item)
-            
-        return todo_items
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to get todo items: {str(e)}"
-        )
+            }],
+            "page_size": page_size if limit is None else min(page_size, limit - count)
+        }
+        if filter:
+            query["filter"] = filter
+        if properties:
+            query["filter_properties"] = properties
+        if cursor:
+            query["start_cursor"] = cursor
 
+        try:
+            response = await notion.databases.query(**query)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to get todo items: {str(e)}"
+            )
 
-def add_todo_item(notion, database_id, name, priority="Low", due_date=None):
+        for page in response["results"]:
+            yield page
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+        if not response.get("has_more"):
+            return
+        cursor = response["next_cursor"]
+
+
+async def iter_todo_items(notion, database_id, page_size=100, limit=None, fields=None):
+    """
+    Iterate over the todo list, following Notion's pagination cursor.
+    Items are yielded as each page of results arrives.
+    
+    Args:
+        notion: Notion AsyncClient instance
+        database_id: ID of the todo database
+        page_size: Items requested per Notion query (max 100)
+        limit: Stop after this many items (None for all)
+        fields: Only fetch and return these todo fields (the id is always
+            included); None for all
+    
+    Yields:
+        dict: Todo item
+    """
+    properties = await todo_property_ids(notion, database_id, fields)
+    async for page in iter_todo_pages(notion, database_id, page_size, limit, properties=properties):
+        item = parse_todo_item(page)
+        yield item if fields is None else project(item, fields)
+
+
+async def add_todo_item(notion, database_id, name, priority="Low", due_date=None):
     """
     Add a new item to the todo list
     
     Args:
-        notion: Notion client instance
+        notion: Notion AsyncClient instance
         database_id: ID of the todo database
         name: Name of the todo item
         priority: Priority level (High, Medium, Low)
@@ -199,58 +313,152 @@ def add_todo_item(notion, database_id, name, priority="Low", due_date=None):
                 }
             }
         print(data)    
-        new_item = notion.pages.create(**data)
+        new_item = await notion.pages.create(**data)
         
         return new_item
         
+    except HTTPException:
+        raise
+        
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to add todo item: {str(e)}"
         )
 
-def create_conv_page(notion,parent_id, title, content):
+def paragraph_block(text):
+    """Build a paragraph block holding a single rich text object."""
+    return {
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {
+            "rich_text": [
+                {
+                    "text": {
+                        "content": text
+                    }
+                }
+            ]
+        }
+    }
+
 
+def iter_text_chunks(content, max_length=MAX_RICH_TEXT_LENGTH):
+    """
+    Split text into pieces Notion accepts as one rich text object. Each line
+    becomes its own piece; long lines are cut at the last whitespace before
+    the limit when there is one.
+    """
+    for match in re.finditer(r"[^\n]+", content):
+        start, end = match.span()
+        while end - start > max_length:
+            cut = content.rfind(" ", start + max_length // 2, start + max_length)
+            if cut == -1:
+                cut = start + max_length
+            yield content[start:cut]
+            start = cut
+            while start < end and content[start] == " ":
+                start += 1
+        if start < end:
+            yield content[start:end]
+
+
+def iter_block_batches(content):
+    """
+    Lazily group transcript paragraphs into batches that fit one Notion
+    request: at most 100 blocks and a bounded number of characters.
+    """
+    batch = []
+    size = 0
+    for chunk in iter_text_chunks(content):
+        if batch and (len(batch) >= MAX_BLOCKS_PER_REQUEST or size + len(chunk) > MAX_CHARS_PER_REQUEST):
+            yield batch
+            batch = []
+            size = 0
+        batch.append(paragraph_block(chunk))
+        size += len(chunk)
+    if batch:
+        yield batch
+
+
+async def create_conv_page(notion, parent_id, title, content, page_id=None, batches_done=0, on_progress=None):
+    """
+    Create a conversation page holding the transcript.
+
+    The page is created with the first batch of blocks; the rest are
+    appended in order, building each batch while the previous append is in
+    flight, so only two batches are ever held in memory.
+
+    A write interrupted part way is resumed by passing back the page id and
+    batch count last reported to on_progress: the page is not created again
+    and batches already appended are skipped.
+
+    Args:
+        notion: Notion AsyncClient instance
+        parent_id: Conversation History page ID
+        title: Page title
+        content: Transcript text of any length
+        page_id: Page created by an earlier, interrupted call
+        batches_done: Batches of content already written to that page
+        on_progress: Awaitable callback(page_id, batches_done) after each write
+
+    Returns:
+        dict: {'id'} of the conversation page
+    """
     try:
-        # Create Conversation History page
-        parent = {"page_id": parent_id}
-        
-        # Create the Conversation History page with basic template
-        conversation_page = notion.pages.create(
-            parent=parent,
-            properties={
-                "title": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": title
-                            }
-                        }
-                    ]
-                }
-            },
-            children=[
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
+        batches = iter_block_batches(content)
+
+        if page_id is None:
+            # Create the Conversation History page with basic template
+            conversation_page = await notion.pages.create(
+                parent={"page_id": parent_id},
+                properties={
+                    "title": {
+                        "title": [
                             {
                                 "text": {
-                                    "content": content
+                                    "content": title[:MAX_RICH_TEXT_LENGTH]
                                 }
                             }
                         ]
                     }
-                }
-            ]
-        )
-        
-        return conversation_page
+                },
+                children=next(batches, [])
+            )
+            page_id = conversation_page["id"]
+            batches_done = 1
+            if on_progress is not None:
+                await on_progress(page_id, batches_done)
+        else:
+            for _ in itertools.islice(batches, batches_done):
+                pass
+
+        pending = None
+        for batch in batches:
+            if pending is not None:
+                await pending
+                batches_done += 1
+                if on_progress is not None:
+                    await on_progress(page_id, batches_done)
+            pending = asyncio.ensure_future(notion.blocks.children.append(
+                block_id=page_id,
+                children=batch
+            ))
+            # Let the append go out before building the next batch
+            await asyncio.sleep(0)
+        if pending is not None:
+            await pending
+            batches_done += 1
+            if on_progress is not None:
+                await on_progress(page_id, batches_done)
+
+        return {"id": page_id}
+
+    except HTTPException:
+        raise
     
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to get todo items: {str(e)}"
+            detail=f"Failed to create conversation page: {str(e)}"
         )
-
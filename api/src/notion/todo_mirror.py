@@ -0,0 +1,185 @@
+import os
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from api.src.notion.notion import iter_todo_pages, parse_todo_item, todo_property_ids
+from api.src.utils import TTLCache, make_etag
+
+
+TODO_MIRROR_MAX_AGE = float(os.getenv("TODO_MIRROR_MAX_AGE", "30"))
+# Archived pages drop out of query results instead of showing up as
+# changes, so a full id reconciliation is needed to notice them.
+TODO_MIRROR_RECONCILE_INTERVAL = float(os.getenv("TODO_MIRROR_RECONCILE_INTERVAL", "300"))
+TODO_MIRROR_MAX_USERS = int(os.getenv("TODO_MIRROR_MAX_USERS", "1024"))
+
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+
+
+class TodoMirror:
+    """Local copy of one user's Todo List database."""
+
+    def __init__(self, database_id: str):
+        self.database_id = database_id
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.edited: Dict[str, str] = {}
+        # Highest last_edited_time seen; incremental syncs start from here
+        self.cursor: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.reconciled_at: Optional[float] = None
+        # page_id -> when a page written through this API was recorded
+        self.recorded_at: Dict[str, float] = {}
+        self.version = 0
+        self.lock = asyncio.Lock()
+
+    def age(self) -> float:
+        """Seconds since the last successful sync."""
+        if self.synced_at is None:
+            return float('inf')
+        return time.monotonic() - self.synced_at
+
+    def apply(self, page: Dict[str, Any], advance_cursor: bool = True) -> None:
+        """
+        Upsert a Notion page, or drop it if it was archived/trashed.
+
+        Args:
+            page: Notion page object
+            advance_cursor: Move the sync cursor up to the page's
+                last_edited_time. Only sync results may do this: a page
+                written locally says nothing about edits made in Notion
+                since the last sync.
+        """
+        if page.get("archived") or page.get("in_trash"):
+            self.remove(page["id"])
+            return
+
+        self.pages[page["id"]] = parse_todo_item(page)
+        edited = page.get("last_edited_time")
+        if edited:
+            self.edited[page["id"]] = edited
+            if advance_cursor and (self.cursor is None or edited > self.cursor):
+                self.cursor = edited
+        self.version += 1
+
+    def remove(self, page_id: str) -> None:
+        if self.pages.pop(page_id, None) is not None:
+            self.edited.pop(page_id, None)
+            self.version += 1
+
+    def etag(self, items: List[Dict[str, Any]], *variant: Any) -> str:
+        """
+        Strong ETag for a response made of these items: each page's
+        last_edited_time plus its values, since Notion rounds
+        last_edited_time to the minute. variant covers anything else that
+        shapes the response, such as the selected fields.
+        """
+        return make_etag(variant, [(self.edited.get(item["id"]), tuple(item.values())) for item in items])
+
+    def items(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Todo items, highest priority first."""
+        items = sorted(
+            self.pages.values(),
+            key=lambda item: PRIORITY_RANK.get(item["priority"], len(PRIORITY_RANK))
+        )
+        return items if limit is None else items[:limit]
+
+
+class TodoMirrorRegistry:
+    """Per-user todo mirrors kept fresh with last_edited_time syncs."""
+
+    def __init__(self, max_users: int = TODO_MIRROR_MAX_USERS):
+        self._mirrors = TTLCache(maxsize=max_users, ttl=24 * 3600)
+
+    def get(self, user_id: str, database_id: str) -> TodoMirror:
+        mirror = self._mirrors.get(user_id)
+        if mirror is None or mirror.database_id != database_id:
+            mirror = TodoMirror(database_id)
+            self._mirrors.set(user_id, mirror)
+        return mirror
+
+    def reset(self, user_id: str) -> None:
+        self._mirrors.invalidate(user_id)
+
+    async def sync(self, mirror: TodoMirror, notion) -> None:
+        """
+        Bring a mirror up to date. The first sync and periodic reconciles
+        read the whole database; other syncs only fetch pages edited on or
+        after the cursor (Notion rounds last_edited_time to the minute, so
+        the boundary minute is re-read).
+        """
+        now = time.monotonic()
+        # Only the properties a todo item is built from
+        properties = await todo_property_ids(notion, mirror.database_id)
+        reconcile = (
+            mirror.cursor is None
+            or mirror.reconciled_at is None
+            or now - mirror.reconciled_at > TODO_MIRROR_RECONCILE_INTERVAL
+        )
+
+        if reconcile:
+            seen = set()
+            async for page in iter_todo_pages(notion, mirror.database_id, properties=properties):
+                seen.add(page["id"])
+                mirror.apply(page)
+            # Pages recorded while the reconcile was reading may have been
+            # created after Notion returned the page they belong on
+            for page_id in [
+                i for i in mirror.pages
+                if i not in seen and mirror.recorded_at.get(i, -1.0) < now
+            ]:
+                mirror.remove(page_id)
+            mirror.recorded_at = {i: t for i, t in mirror.recorded_at.items() if t >= now}
+            mirror.reconciled_at = now
+        else:
+            changed = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": mirror.cursor}
+            }
+            async for page in iter_todo_pages(notion, mirror.database_id, filter=changed, properties=properties):
+                mirror.apply(page)
+
+        mirror.synced_at = now
+
+    async def get_fresh(
+        self,
+        user_id: str,
+        database_id: str,
+        notion,
+        max_age: float = TODO_MIRROR_MAX_AGE
+    ) -> TodoMirror:
+        """
+        Return the user's mirror, syncing it first if older than max_age.
+
+        Args:
+            user_id: Owner of the todo list
+            database_id: Todo List database ID
+            notion: Notion AsyncClient for the user
+            max_age: Freshness bound in seconds (0 forces a sync)
+
+        Returns:
+            TodoMirror no older than max_age
+        """
+        mirror = self.get(user_id, database_id)
+        if mirror.age() <= max_age:
+            return mirror
+
+        async with mirror.lock:
+            # Another request may have synced while we waited
+            if mirror.age() <= max_age:
+                return mirror
+            await self.sync(mirror, notion)
+        return mirror
+
+    def record(self, user_id: str, database_id: str, page: Dict[str, Any]) -> None:
+        """Apply a page written through this API to the user's mirror."""
+        mirror = self._mirrors.get(user_id)
+        if mirror is not None and mirror.database_id == database_id and page:
+            try:
+                mirror.apply(page, advance_cursor=False)
+                mirror.recorded_at[page["id"]] = time.monotonic()
+            except (KeyError, IndexError, TypeError):
+                # Unexpected page shape; let the next read resync instead
+                mirror.synced_at = None
+
+
+todo_mirrors = TodoMirrorRegistry()
@@ -1,13 +1,17 @@
 import json
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel    
-
-from api.src.config.calendar_config import DEFAULT_TIME_ZONE
-from api.src.services.gcal_service import GoogleCalendarService
-from api.src.db.supabase import select_data
-from api.index import supabase
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from googleapiclient.errors import HttpError
+from pydantic import BaseModel, Field
+
+from api.src.config.calendar_config import DEFAULT_TIME_ZONE, EVENT_FIELDS, MAX_BATCH_OPERATIONS, SYNC_MAX_AGE
+from api.src.services.gcal_service import EventConflict, GoogleCalendarService
+from api.src.services.gcal_sync import calendar_sync
+from api.src.db.credentials import get_integration
+from api.src.singleflight import coalesce
+from api.src.utils import conditional_response, parse_fields, project
 router = APIRouter(prefix="/api/py/calendar", tags=["calendar"])
 
 class Attendee(BaseModel):
@@ -25,6 +29,7 @@ class EventCreate(BaseModel):
 
 class EventUpdate(BaseModel):
     user_id: str
+    calendar_id: str = "primary"
     summary: Optional[str] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
@@ -33,9 +38,27 @@ class EventUpdate(BaseModel):
     attendees: Optional[List[Attendee]] = None
     timezone: Optional[str] = None
 
-def get_auth_token(user_id: str) -> str:
+class BatchOperation(BaseModel):
+    action: Literal["create", "update", "delete"]
+    event_id: Optional[str] = None
+    calendar_id: str = "primary"
+    summary: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    attendees: Optional[List[Attendee]] = None
+    timezone: Optional[str] = None
+    etag: Optional[str] = None
+
+class EventBatch(BaseModel):
+    user_id: str
+    operations: List[BatchOperation] = Field(min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+async def get_auth_token(user_id: str) -> str:
     """
-    Get Google Calendar auth token for the user from database.
+    Get Google Calendar auth token for the user from the credential cache,
+    falling back to the database.
     
     Args:
         user_id: User ID to fetch auth token for
@@ -46,22 +69,27 @@ def get_auth_token(user_id: str) -> str:
     Raises:
         HTTPException: If auth token not found for user
     """
-    result = select_data(
-        supabase=supabase,  # It will use default client
-        table='google_integrations',
-        columns='access_token',
-        filters={'user_id': user_id}
-    )
+    result = await get_integration(user_id, 'google')
     
-    if not result or len(result) == 0:
+    if not result:
         raise HTTPException(
             status_code=404,
             detail=f"No Google Calendar integration found for user {user_id}"
         )
     
-    return result[0]['access_token']
+    return result['access_token']
 
-def get_calendar_service(user_id: str) -> GoogleCalendarService:
+def resolve_etag(user_id: str, event_id: str, calendar_id: str, if_match: Optional[str]) -> Optional[str]:
+    """
+    The If-Match precondition for an update: the caller's ETag, otherwise
+    the ETag of the cached copy of the event. "*" forces an unconditional
+    update.
+    """
+    if if_match == "*":
+        return None
+    return if_match or calendar_sync.cached_etag(user_id, event_id, calendar_id)
+
+async def get_calendar_service(user_id: str) -> GoogleCalendarService:
     """
     Create a new calendar service instance for the user.
     
@@ -71,16 +99,46 @@ def get_calendar_service(user_id: str) -> GoogleCalendarService:
     Returns:
         GoogleCalendarService instance
     """
-    auth_token = get_auth_token(user_id)
-    return GoogleCalendarService(auth_token=auth_token)
+    auth_token = await get_auth_token(user_id)
+    return await run_in_threadpool(GoogleCalendarService, auth_token=auth_token)
 
 @router.get("/events")
-async def list_events(user_id: str, max_results: int = 10):
-    """List upcoming calendar events."""
+@coalesce("calendar_events")
+async def list_events(
+    user_id: str,
+    max_results: int = 10,
+    max_age: float = SYNC_MAX_AGE,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    List upcoming calendar events from the local event store. The store is
+    brought up to date with an incremental sync only when it is older than
+    max_age seconds. fields (e.g. "summary,start,end,status") trims each
+    event to its id and those fields.
+
+    The response carries an ETag derived from the events' Google etags; a
+    request whose If-None-Match still matches gets 304 with no body.
+    """
     try:
-        calendar_service = get_calendar_service(user_id)
-        events = calendar_service.list_upcoming_events(max_results=max_results)
-        return {"events": events}
+        selected = parse_fields(fields, EVENT_FIELDS + ('calendarId',))
+        store = await calendar_sync.get_fresh_store(
+            user_id,
+            lambda: get_calendar_service(user_id),
+            max_age=max_age
+        )
+        events = store.upcoming(max_results)
+
+        def content():
+            if selected is None:
+                return {"events": events}
+            return {"events": [project(event, selected) for event in events]}
+
+        return conditional_response(content, store.etag(events, selected), if_none_match)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -92,10 +150,11 @@ async def create_event(event: Request):
         print('--------------------------------')
         print(event)
         print('--------------------------------')
-        calendar_service = get_calendar_service(event['user_id'])
+        calendar_service = await get_calendar_service(event['user_id'])
         # attendees_dict = [{"email": attendee.email} for attendee in (event.attendees or [])]
         
-        created_event = calendar_service.create_event(
+        created_event = await run_in_threadpool(
+            calendar_service.create_event,
             summary=event['summary'],
             start_time=datetime.fromisoformat(event['start_time']),
             end_time=datetime.fromisoformat(event['end_time']),
@@ -107,45 +166,122 @@ async def create_event(event: Request):
         print('--------------------------------')
         print(created_event)
         print('--------------------------------')
+        calendar_sync.record(event['user_id'], created_event)
         return created_event
+    except HTTPException:
+        raise
     except Exception as e:
         print('--------------------------------')
         print(e)
         print('--------------------------------')
         raise HTTPException(status_code=500, detail=str(e))
 
-# @router.put("/events/{event_id}")
-# async def update_event(event_id: str, event: EventUpdate):
-#     """Update an existing calendar event."""
-#     try:
-#         calendar_service = get_calendar_service(event.user_id)
-#         attendees_dict = None
-#         if event.attendees:
-#             attendees_dict = [{"email": attendee.email} for attendee in event.attendees]
-        
-#         updated_event = calendar_service.update_event(
-#             event_id=event_id,
-#             summary=event.summary,
-#             start_time=event.start_time,
-#             end_time=event.end_time,
-#             description=event.description,
-#             location=event.location,
-#             attendees=attendees_dict,
-#             timezone=event.timezone or "UTC"
-#         )
-#         return updated_event
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
+@router.post("/events/batch")
+async def batch_events(batch: EventBatch):
+    """
+    Create, update and delete many events in as few round trips as
+    possible. Operations are sent through Google's batch endpoint and each
+    one reports its own outcome, so a partial failure does not fail the
+    whole request.
+    """
+    try:
+        for index, operation in enumerate(batch.operations):
+            if operation.action == "create" and not (operation.summary and operation.start_time and operation.end_time):
+                raise HTTPException(status_code=400, detail=f"Operation {index}: create needs summary, start_time and end_time")
+            if operation.action != "create" and not operation.event_id:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: {operation.action} needs event_id")
+
+        calendar_service = await get_calendar_service(batch.user_id)
+        operations = [operation.model_dump() for operation in batch.operations]
+        for operation in operations:
+            if operation["action"] == "update":
+                operation["etag"] = resolve_etag(batch.user_id, operation["event_id"], operation["calendar_id"], operation["etag"])
+        results = await run_in_threadpool(calendar_service.batch_events, operations)
+
+        for operation, result in zip(batch.operations, results):
+            if not result["success"]:
+                if result.get("status") == 412:
+                    calendar_sync.mark_stale(batch.user_id)
+                continue
+            if operation.action == "delete":
+                calendar_sync.forget(batch.user_id, operation.event_id, operation.calendar_id)
+            else:
+                calendar_sync.record(batch.user_id, result["event"], operation.calendar_id)
+        failed = sum(1 for result in results if not result["success"])
+
+        return {
+            "success": failed == 0,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/events/{event_id}")
+async def update_event(event_id: str, event: EventUpdate, if_match: Optional[str] = Header(None)):
+    """
+    Update an existing calendar event. Only the given fields are sent, in
+    one PATCH. The update is conditional on the If-Match header, or on the
+    ETag of the locally synced copy when the header is absent, so edits
+    made elsewhere in the meantime are not overwritten.
+    """
+    try:
+        calendar_service = await get_calendar_service(event.user_id)
+        attendees_dict = None
+        if event.attendees:
+            attendees_dict = [{"email": attendee.email} for attendee in event.attendees]
+
+        updated_event = await run_in_threadpool(
+            calendar_service.update_event,
+            event_id=event_id,
+            summary=event.summary,
+            start_time=event.start_time,
+            end_time=event.end_time,
+            description=event.description,
+            location=event.location,
+            attendees=attendees_dict,
+            timezone=event.timezone or DEFAULT_TIME_ZONE,
+            etag=resolve_etag(event.user_id, event_id, event.calendar_id, if_match),
+            calendar_id=event.calendar_id
+        )
+        if not updated_event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        calendar_sync.record(event.user_id, updated_event, event.calendar_id)
+        return updated_event
+    except EventConflict:
+        calendar_sync.mark_stale(event.user_id)
+        raise HTTPException(
+            status_code=412,
+            detail="Event was changed since it was last read; fetch it again and retry"
+        )
+    except HttpError as error:
+        # Pass client errors (bad time range, no access) through as they
+        # are; anything else is Google failing
+        status = error.resp.status
+        raise HTTPException(
+            status_code=status if 400 <= status < 500 else 502,
+            detail=f"Google Calendar error: {error.reason or status}"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/events/{event_id}")
 async def delete_event(event_id: str, user_id: str):
     """Delete a calendar event."""
     try:
-        calendar_service = get_calendar_service(user_id)
-        success = calendar_service.delete_event(event_id)
+        calendar_service = await get_calendar_service(user_id)
+        success = await run_in_threadpool(calendar_service.delete_event, event_id)
         if success:
+            calendar_sync.forget(user_id, event_id)
             return {"message": "Event deleted successfully"}
         raise HTTPException(status_code=404, detail="Event not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
     
@@ -1,20 +1,209 @@
 import os
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+import json
+import heapq
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from ..config.calendar_config import (
     SCOPES,
+    BATCH_RETRIES,
+    BATCH_SIZE,
+    CALENDAR_API_ENDPOINT,
     CALENDAR_API_VERSION,
     CALENDAR_SERVICE_NAME,
     DATETIME_FORMAT,
     DEFAULT_MAX_RESULTS,
-    DEFAULT_TIME_ZONE
+    DEFAULT_TIME_ZONE,
+    EVENT_FIELDS_MASK,
+    HTTP_POOL_SIZE,
+    HTTP_TIMEOUT,
+    SERVICE_CACHE_SIZE,
+    SERVICE_CACHE_TTL,
+    SYNC_PAGE_SIZE
 )
+from ..metrics import track_upstream
+from ..utils import TTLCache
+from .outbound import error_status, outbound
+
+if TYPE_CHECKING:
+    import httplib2
+
+
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+
+def get_discovery_document() -> Dict[str, Any]:
+    """
+    Load the Calendar discovery document once from the copy bundled with
+    google-api-python-client. Never touches the network.
+    """
+    global _discovery_document
+    if _discovery_document is None:
+        with _discovery_lock:
+            if _discovery_document is None:
+                from googleapiclient.discovery_cache import get_static_doc
+
+                doc = get_static_doc(CALENDAR_SERVICE_NAME, CALENDAR_API_VERSION)
+                if doc is None:
+                    raise Exception(
+                        f"No bundled discovery document for {CALENDAR_SERVICE_NAME} {CALENDAR_API_VERSION}"
+                    )
+                _discovery_document = json.loads(doc)
+    return _discovery_document
+
+
+def get_batch_uri() -> str:
+    """
+    The batch endpoint. The client library always derives it from the
+    discovery rootUrl, so an overridden API endpoint is mapped here too.
+    """
+    doc = get_discovery_document()
+    root = doc['rootUrl']
+    if CALENDAR_API_ENDPOINT:
+        endpoint = CALENDAR_API_ENDPOINT if CALENDAR_API_ENDPOINT.endswith('/') else CALENDAR_API_ENDPOINT + '/'
+        root = endpoint.removesuffix(doc['servicePath'])
+    return root + doc.get('batchPath', 'batch')
+
+
+class HttpPool:
+    """
+    Pool of httplib2 transports. httplib2.Http is not thread-safe, so every
+    in-flight request checks out its own instance and returns it afterwards,
+    keeping the kept-alive connection for the next request.
+    """
+
+    def __init__(self, size: int = HTTP_POOL_SIZE, timeout: float = HTTP_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        http = self._checkout()
+        try:
+            yield http
+        finally:
+            self._idle.put(http)
+
+    def _checkout(self) -> "httplib2.Http":
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                import httplib2
+
+                self._created += 1
+                return httplib2.Http(timeout=self.timeout)
+        # Pool exhausted: wait for a transport to be returned
+        return self._idle.get()
+
+
+_http_pool = HttpPool()
+
+# Built service objects keyed by auth token. Tokens are short-lived, so the
+# TTL only has to outlast a single access token.
+_service_cache = TTLCache(maxsize=SERVICE_CACHE_SIZE, ttl=SERVICE_CACHE_TTL)
+
+
+class SyncTokenExpired(Exception):
+    """The sync token was invalidated by Google (HTTP 410); a full sync is needed."""
+
+
+class EventConflict(Exception):
+    """The event changed since the ETag sent with an update (HTTP 412)."""
+
+
+# Worker threads for fanning out blocking API calls across calendars
+_executor = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="gcal")
+
+
+def run_concurrently(fn: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+    """
+    Call fn on every item in parallel worker threads.
+
+    Returns:
+        Results in item order; a call that raised yields its exception
+    """
+    if len(items) == 1:
+        # Nothing to overlap with; skip the thread hop
+        try:
+            return [fn(items[0])]
+        except Exception as e:
+            return [e]
+    futures = [_executor.submit(fn, item) for item in items]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def event_time(value: Dict[str, Any]) -> float:
+    """Convert a Google start/end object to a UTC timestamp."""
+    if 'dateTime' in value:
+        return datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00')).timestamp()
+    # All-day events only carry a date
+    return datetime.fromisoformat(value['date']).replace(tzinfo=timezone.utc).timestamp()
+
+
+def merge_events(streams: Iterable[Iterable[Dict[str, Any]]], max_results: int) -> List[Dict[str, Any]]:
+    """
+    Heap-based k-way merge of event streams that are each ordered by start
+    time, stopping after max_results. An event shared into several of the
+    user's calendars is returned once.
+    """
+    merged = heapq.merge(*streams, key=lambda event: event_time(event['start']))
+    results = []
+    seen = set()
+    for event in merged:
+        identity = (event.get('iCalUID') or event['id'], event.get('recurringEventId'), event_time(event['start']))
+        if identity in seen:
+            continue
+        seen.add(identity)
+        results.append(event)
+        if len(results) >= max_results:
+            break
+    return results
+
+
+def event_body(
+    summary: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    description: Optional[str] = None,
+    location: Optional[str] = None,
+    attendees: Optional[List[Dict[str, str]]] = None,
+    timezone: str = DEFAULT_TIME_ZONE
+) -> Dict[str, Any]:
+    """Event resource with only the given fields, usable for inserts and patches."""
+    event: Dict[str, Any] = {}
+    if summary:
+        event['summary'] = summary
+    if description:
+        event['description'] = description
+    if location:
+        event['location'] = location
+    if start_time:
+        event['start'] = {'dateTime': start_time.strftime(DATETIME_FORMAT), 'timeZone': timezone}
+    if end_time:
+        event['end'] = {'dateTime': end_time.strftime(DATETIME_FORMAT), 'timeZone': timezone}
+    if attendees:
+        event['attendees'] = attendees
+    return event
+
 
 class GoogleCalendarService:
     def __init__(self, auth_token: str):
@@ -25,55 +214,258 @@ class GoogleCalendarService:
             auth_token: The Google OAuth2 token
         """
         self.auth_token = auth_token
+        self.credentials = None
         self.service = None
         self.initialize_service()
 
+    def _execute(self, request) -> Any:
+        """
+        Execute an API request on a pooled, per-call transport, through the
+        shared outbound rate limiter and retry layer.
+        """
+        from google_auth_httplib2 import AuthorizedHttp
+
+        def send():
+            with _http_pool.acquire() as http, track_upstream("google", request.methodId or request.method):
+                return request.execute(http=AuthorizedHttp(self.credentials, http=http))
+
+        return outbound.call_sync(
+            "google",
+            self.auth_token,
+            send,
+            idempotent=request.method in ("GET", "DELETE")
+        )
+
+    def _execute_batch(self, requests: List[Any]) -> List[Tuple[Any, Optional[Exception]]]:
+        """
+        Send up to BATCH_SIZE requests as one multipart batch request.
+
+        The caller takes the batch's rate limit tokens (one per request it
+        carries, since Google counts each against the quota) and handles
+        429s, so this is a single attempt.
+
+        Returns:
+            (response, exception) for each request, in order
+        """
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.http import BatchHttpRequest
+
+        responses: Dict[str, Tuple[Any, Optional[Exception]]] = {}
+
+        def collect(request_id, response, exception):
+            responses[request_id] = (response, exception)
+
+        batch = BatchHttpRequest(callback=collect, batch_uri=get_batch_uri())
+        for index, request in enumerate(requests):
+            batch.add(request, request_id=str(index))
+        with _http_pool.acquire() as http, track_upstream("google", "calendar.batch"):
+            batch.execute(http=AuthorizedHttp(self.credentials, http=http))
+        return [
+            responses.get(str(index), (None, Exception("No response in batch")))
+            for index in range(len(requests))
+        ]
+
     def initialize_service(self) -> None:
-        """Initialize the Google Calendar service with token authentication."""
+        """
+        Initialize the Google Calendar service with token authentication.
+        Service objects are reused across requests for the same token.
+        """
+        # The google-auth and discovery stacks are imported on first use so
+        # they stay off the cold-start path of requests that never need them
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build_from_document
+
         try:
             # Create credentials from the auth token
-            creds = Credentials(
+            self.credentials = Credentials(
                 token=self.auth_token,
                 scopes=SCOPES
             )
-            
-            self.service = build(CALENDAR_SERVICE_NAME, CALENDAR_API_VERSION, credentials=creds)
+
+            service = _service_cache.get(self.auth_token)
+            if service is None:
+                service = build_from_document(
+                    get_discovery_document(),
+                    credentials=self.credentials,
+                    client_options={"api_endpoint": CALENDAR_API_ENDPOINT} if CALENDAR_API_ENDPOINT else None
+                )
+                _service_cache.set(self.auth_token, service)
+            self.service = service
         except Exception as e:
             raise Exception(f"Failed to initialize calendar service: {str(e)}")
 
+    def list_calendars(self) -> List[Dict[str, Any]]:
+        """
+        The user's calendar list entries that are shown in their UI: the
+        primary calendar plus every selected (ticked) calendar.
+
+        Returns:
+            calendarList entries, primary first
+        """
+        calendars = []
+        page_token = None
+        while True:
+            result = self._execute(self.service.calendarList().list(
+                pageToken=page_token,
+                showHidden=False,
+                fields='items(id,summary,primary,selected,accessRole),nextPageToken'
+            ))
+            calendars.extend(
+                entry for entry in result.get('items', [])
+                if entry.get('primary') or entry.get('selected')
+            )
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+        calendars.sort(key=lambda entry: not entry.get('primary'))
+        return calendars
+
+    def _list_calendar_events(self, calendar_id: str, max_results: int, time_min: datetime) -> List[Dict[str, Any]]:
+        """One page of a calendar's upcoming events, ordered by start time."""
+        result = self._execute(self.service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min.isoformat() + 'Z',
+            maxResults=max_results,
+            singleEvents=True,
+            orderBy='startTime',
+            fields=EVENT_FIELDS_MASK
+        ))
+        events = result.get('items', [])
+        for event in events:
+            event['calendarId'] = calendar_id
+        return events
+
     def list_upcoming_events(
         self,
         max_results: int = DEFAULT_MAX_RESULTS,
-        time_min: Optional[datetime] = None
+        time_min: Optional[datetime] = None,
+        calendar_ids: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
-        List upcoming calendar events.
-        
+        List upcoming events across the user's calendars.
+
+        Calendars are fetched concurrently, each already ordered by start
+        time, and k-way merged until max_results events are produced. No
+        calendar can contribute more than max_results events, so one page
+        per calendar is enough and latency tracks the slowest calendar.
+
         Args:
             max_results: Maximum number of events to return
             time_min: Start time for fetching events (defaults to now)
-            
+            calendar_ids: Calendars to read (defaults to every selected calendar)
+
         Returns:
-            List of calendar events
+            List of calendar events, each tagged with its calendarId
         """
         try:
             if not time_min:
                 time_min = datetime.utcnow()
+            if calendar_ids is None:
+                calendar_ids = [entry['id'] for entry in self.list_calendars()]
 
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=time_min.isoformat() + 'Z',
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            return events
+            streams, errors = [], []
+            for calendar_id, result in zip(calendar_ids, run_concurrently(
+                lambda calendar_id: self._list_calendar_events(calendar_id, max_results, time_min),
+                calendar_ids
+            )):
+                if isinstance(result, Exception):
+                    # One unreadable shared calendar should not hide the rest
+                    print(f'Failed to list events for calendar {calendar_id}: {result}')
+                    errors.append(result)
+                else:
+                    streams.append(result)
+            if errors and not streams:
+                raise errors[0]
+
+            return merge_events(streams, max_results)
         except HttpError as error:
             print(f'An error occurred: {error}')
             return []
 
+    def free_busy(
+        self,
+        time_min: datetime,
+        time_max: datetime,
+        calendar_ids: Optional[List[str]] = None
+    ) -> List[Tuple[float, float]]:
+        """
+        Busy intervals across the user's calendars from the freeBusy API.
+
+        Args:
+            time_min: Start of the window (timezone-aware)
+            time_max: End of the window (timezone-aware)
+            calendar_ids: Calendars to check (defaults to every selected calendar)
+
+        Returns:
+            (start, end) UTC timestamps, unmerged
+        """
+        if calendar_ids is None:
+            calendar_ids = [entry['id'] for entry in self.list_calendars()]
+
+        result = self._execute(self.service.freebusy().query(body={
+            'timeMin': time_min.isoformat(),
+            'timeMax': time_max.isoformat(),
+            'items': [{'id': calendar_id} for calendar_id in calendar_ids]
+        }))
+
+        busy = []
+        for calendar_id, calendar in result.get('calendars', {}).items():
+            if calendar.get('errors'):
+                print(f'freeBusy failed for calendar {calendar_id}: {calendar["errors"]}')
+            for period in calendar.get('busy', []):
+                busy.append((event_time({'dateTime': period['start']}), event_time({'dateTime': period['end']})))
+        return busy
+
+    def list_event_changes(
+        self,
+        sync_token: Optional[str] = None,
+        time_min: Optional[datetime] = None,
+        calendar_id: str = 'primary'
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Fetch events for a full sync, or the changes since a sync token.
+
+        Args:
+            sync_token: Token from the previous sync; None for a full sync
+            time_min: Lower bound for the full sync (ignored with sync_token)
+            calendar_id: Calendar to read
+
+        Returns:
+            (events, next_sync_token). Deleted events have status 'cancelled'.
+
+        Raises:
+            SyncTokenExpired: If Google rejected the sync token
+            HttpError: On any other API error
+        """
+        params = {
+            'calendarId': calendar_id,
+            'singleEvents': True,
+            'showDeleted': True,
+            'maxResults': SYNC_PAGE_SIZE,
+            'fields': f'{EVENT_FIELDS_MASK},nextPageToken,nextSyncToken'
+        }
+        if sync_token:
+            params['syncToken'] = sync_token
+        elif time_min:
+            params['timeMin'] = time_min.isoformat() + 'Z'
+
+        events = []
+        page_token = None
+        while True:
+            try:
+                result = self._execute(self.service.events().list(
+                    pageToken=page_token, **params
+                ))
+            except HttpError as error:
+                if error.resp.status == 410:
+                    raise SyncTokenExpired(str(error))
+                raise
+
+            events.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return events, result.get('nextSyncToken')
+
     def create_event(
         self,
         summary: str,
@@ -100,28 +492,13 @@ class GoogleCalendarService:
             Created event details
         """
         try:
-            event = {
-                'summary': summary,
-                'location': location,
-                'description': description,
-                'start': {
-                    'dateTime': start_time.strftime(DATETIME_FORMAT),
-                    'timeZone': timezone,
-                },
-                'end': {
-                    'dateTime': end_time.strftime(DATETIME_FORMAT),
-                    'timeZone': timezone,
-                }
-            }
-
-            if attendees:
-                event['attendees'] = attendees
-
-            event = self.service.events().insert(
+            event = event_body(summary, start_time, end_time, description, location, attendees, timezone)
+
+            event = self._execute(self.service.events().insert(
                 calendarId='primary',
                 body=event,
                 sendUpdates='all'
-            ).execute()
+            ))
             
             return event
         except HttpError as error:
@@ -137,10 +514,13 @@ class GoogleCalendarService:
         description: Optional[str] = None,
         location: Optional[str] = None,
         attendees: Optional[List[Dict[str, str]]] = None,
-        timezone: str = DEFAULT_TIME_ZONE
+        timezone: str = DEFAULT_TIME_ZONE,
+        etag: Optional[str] = None,
+        calendar_id: str = 'primary'
     ) -> Dict[str, Any]:
         """
-        Update an existing calendar event.
+        Update an existing calendar event with a single PATCH that carries
+        only the changed fields.
         
         Args:
             event_id: ID of the event to update
@@ -151,43 +531,33 @@ class GoogleCalendarService:
             location: New location
             attendees: New list of attendees
             timezone: Timezone for the event
+            etag: Only apply the update if the event still has this ETag
+            calendar_id: Calendar holding the event
             
         Returns:
-            Updated event details
+            Updated event details, or {} if the event does not exist
+
+        Raises:
+            EventConflict: If the event no longer matches the ETag
+            HttpError: For any other upstream failure
         """
         try:
-            event = self.service.events().get(calendarId='primary', eventId=event_id).execute()
-
-            if summary:
-                event['summary'] = summary
-            if description:
-                event['description'] = description
-            if location:
-                event['location'] = location
-            if start_time:
-                event['start'] = {
-                    'dateTime': start_time.strftime(DATETIME_FORMAT),
-                    'timeZone': timezone
-                }
-            if end_time:
-                event['end'] = {
-                    'dateTime': end_time.strftime(DATETIME_FORMAT),
-                    'timeZone': timezone
-                }
-            if attendees:
-                event['attendees'] = attendees
-
-            updated_event = self.service.events().update(
-                calendarId='primary',
+            request = self.service.events().patch(
+                calendarId=calendar_id,
                 eventId=event_id,
-                body=event,
+                body=event_body(summary, start_time, end_time, description, location, attendees, timezone),
                 sendUpdates='all'
-            ).execute()
-            
-            return updated_event
+            )
+            if etag:
+                request.headers['If-Match'] = etag
+            return self._execute(request)
         except HttpError as error:
+            if error.resp.status == 412:
+                raise EventConflict(f"Event {event_id} was modified since ETag {etag}")
             print(f'An error occurred: {error}')
-            return {}
+            if error.resp.status in (404, 410):
+                return {}
+            raise
 
     def delete_event(self, event_id: str) -> bool:
         """
@@ -200,12 +570,113 @@ class GoogleCalendarService:
             True if deletion was successful, False otherwise
         """
         try:
-            self.service.events().delete(
+            self._execute(self.service.events().delete(
                 calendarId='primary',
                 eventId=event_id,
                 sendUpdates='all'
-            ).execute()
+            ))
             return True
         except HttpError as error:
             print(f'An error occurred: {error}')
             return False
+
+    def _batch_request(self, operation: Dict[str, Any]):
+        """Build the (unsent) API request for one batch operation."""
+        action = operation['action']
+        calendar_id = operation.get('calendar_id') or 'primary'
+        fields = {
+            key: operation.get(key)
+            for key in ('summary', 'start_time', 'end_time', 'description', 'location', 'attendees')
+        }
+        body = event_body(**fields, timezone=operation.get('timezone') or DEFAULT_TIME_ZONE)
+
+        if action == 'create':
+            return self.service.events().insert(calendarId=calendar_id, body=body, sendUpdates='all')
+        if action == 'update':
+            # A patch sends only the changed fields, so no read is needed first
+            request = self.service.events().patch(
+                calendarId=calendar_id,
+                eventId=operation['event_id'],
+                body=body,
+                sendUpdates='all'
+            )
+            if operation.get('etag'):
+                request.headers['If-Match'] = operation['etag']
+            return request
+        if action == 'delete':
+            return self.service.events().delete(
+                calendarId=calendar_id,
+                eventId=operation['event_id'],
+                sendUpdates='all'
+            )
+        raise ValueError(f"Unknown batch action: {action}")
+
+    def batch_events(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create, update and delete many events through the batch endpoint,
+        BATCH_SIZE operations per HTTP request. Batches are sent
+        concurrently, and operations rejected with 429 are resent in a
+        later round once the token's bucket has waited out Retry-After.
+
+        Args:
+            operations: Dicts with 'action' ('create', 'update' or 'delete'),
+                'event_id' for updates and deletes, an optional 'calendar_id'
+                (defaults to primary), an optional 'etag' precondition for
+                updates and the event fields accepted by create_event
+
+        Returns:
+            One result per operation, in order: {'index', 'action',
+            'success', 'event'} or {'index', 'action', 'success', 'status',
+            'error'}
+        """
+        requests = [self._batch_request(operation) for operation in operations]
+        outcomes: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * len(requests)
+
+        pending = list(range(len(requests)))
+        for round_number in range(BATCH_RETRIES + 1):
+            chunks = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+            futures = []
+            for chunk in chunks:
+                # Wait for the chunk's tokens here rather than in a pool
+                # thread, so a large batch never parks shared workers
+                outbound.acquire_sync("google", self.auth_token, cost=len(chunk))
+                futures.append(_executor.submit(
+                    self._execute_batch, [requests[index] for index in chunk]
+                ))
+
+            retry = []
+            retry_after = None
+            for chunk, future in zip(chunks, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The batch request itself failed, so every call in it did
+                    result = [(None, e)] * len(chunk)
+                for index, (response, error) in zip(chunk, result):
+                    outcomes[index] = (response, error)
+                    if error is None:
+                        continue
+                    status, after = error_status(error)
+                    if status == 429 and round_number < BATCH_RETRIES:
+                        retry.append(index)
+                        if after is not None:
+                            retry_after = max(retry_after or 0.0, after)
+            if not retry:
+                break
+            # Back off like outbound.call: the next round's token wait then
+            # covers Retry-After, or a jittered delay without one
+            outbound.rate_limited("google", self.auth_token, retry_after, round_number)
+            pending = retry
+
+        results = []
+        for index, (operation, (response, error)) in enumerate(zip(operations, outcomes)):
+            result = {'index': index, 'action': operation['action'], 'success': error is None}
+            if error is None:
+                result['event'] = response or None
+            else:
+                status, _ = error_status(error)
+                result['status'] = status
+                result['error'] = getattr(error, 'reason', None) or getattr(error, 'detail', None) or str(error)
+                print(f'Batch {operation["action"]} failed: {error}')
+            results.append(result)
+        return results
@@ -0,0 +1,371 @@
+import time
+import asyncio
+import bisect
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config.calendar_config import (
+    CALENDAR_LIST_TTL,
+    SYNC_LOOKBACK_DAYS,
+    SYNC_MAX_AGE,
+    SYNC_MAX_USERS
+)
+from ..utils import TTLCache, make_etag
+from .gcal_service import (
+    GoogleCalendarService,
+    SyncTokenExpired,
+    event_time,
+    merge_events,
+    run_concurrently
+)
+
+
+class EventStore:
+    """
+    Local copy of one calendar, kept ordered by start time so
+    upcoming-event reads are a bisect plus a short scan.
+    """
+
+    def __init__(self):
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.sync_token: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.version = 0
+        self._order: List[Tuple[float, str]] = []
+        self._keys: Dict[str, Tuple[float, str]] = {}
+        self._ends: Dict[str, float] = {}
+        self._max_duration = 0.0
+        self._lock = threading.Lock()
+
+    def age(self) -> float:
+        """Seconds since the last successful sync."""
+        if self.synced_at is None:
+            return float('inf')
+        return time.monotonic() - self.synced_at
+
+    def apply(self, events: List[Dict[str, Any]]) -> None:
+        """Apply a batch of upserts and 'cancelled' deletions."""
+        with self._lock:
+            for event in events:
+                if event.get('status') == 'cancelled' or 'start' not in event:
+                    self._remove(event['id'])
+                else:
+                    self._upsert(event)
+            self.version += 1
+
+    def get(self, event_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.events.get(event_id)
+
+    def remove(self, event_id: str) -> None:
+        with self._lock:
+            self._remove(event_id)
+            self.version += 1
+
+    def reset(self) -> None:
+        """Drop everything ahead of a full resync."""
+        with self._lock:
+            self.events.clear()
+            self._order.clear()
+            self._keys.clear()
+            self._ends.clear()
+            self._max_duration = 0.0
+            self.sync_token = None
+            self.version += 1
+
+    def prune(self, before: float) -> None:
+        """Forget events that ended before the given timestamp."""
+        with self._lock:
+            for event_id in [i for i, end in self._ends.items() if end < before]:
+                self._remove(event_id)
+
+    def upcoming(self, max_results: int, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Events that have not ended yet, ordered by start time, matching
+        Google's timeMin + orderBy=startTime semantics.
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            # Events still in progress started at most _max_duration ago
+            index = bisect.bisect_left(self._order, (now - self._max_duration, ''))
+            results = []
+            for _, event_id in self._order[index:]:
+                if self._ends[event_id] > now:
+                    results.append(self.events[event_id])
+                    if len(results) >= max_results:
+                        break
+            return results
+
+    def between(self, start: float, end: float) -> List[Dict[str, Any]]:
+        """Events overlapping [start, end), ordered by start time."""
+        with self._lock:
+            index = bisect.bisect_left(self._order, (start - self._max_duration, ''))
+            results = []
+            for event_start, event_id in self._order[index:]:
+                if event_start >= end:
+                    break
+                if self._ends[event_id] > start:
+                    results.append(self.events[event_id])
+            return results
+
+    def _upsert(self, event: Dict[str, Any]) -> None:
+        self._remove(event['id'])
+        start = event_time(event['start'])
+        end = event_time(event.get('end', event['start']))
+        key = (start, event['id'])
+        bisect.insort(self._order, key)
+        self._keys[event['id']] = key
+        self._ends[event['id']] = end
+        self.events[event['id']] = event
+        self._max_duration = max(self._max_duration, end - start)
+
+    def _remove(self, event_id: str) -> None:
+        key = self._keys.pop(event_id, None)
+        if key is None:
+            return
+        index = bisect.bisect_left(self._order, key)
+        del self._order[index]
+        del self._ends[event_id]
+        del self.events[event_id]
+
+
+class CalendarSet:
+    """
+    All of one user's synced calendars: an EventStore per selected
+    calendar, read together through a k-way merge.
+    """
+
+    def __init__(self):
+        self.stores: Dict[str, EventStore] = {}
+        self.primary_id = 'primary'
+        self.listed_at: Optional[float] = None
+        self.synced_at: Optional[float] = None
+        # Bumped whenever calendars are added or dropped
+        self._generation = 0
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """Changes whenever any calendar's contents or the calendar set change."""
+        return self._generation, sum(store.version for store in list(self.stores.values()))
+
+    def age(self) -> float:
+        """Seconds since the last successful sync."""
+        if self.synced_at is None:
+            return float('inf')
+        return time.monotonic() - self.synced_at
+
+    def store(self, calendar_id: str = 'primary') -> Optional[EventStore]:
+        """The store of a calendar; 'primary' is an alias for the primary calendar."""
+        if calendar_id == 'primary':
+            calendar_id = self.primary_id
+        return self.stores.get(calendar_id)
+
+    def set_calendars(self, calendar_ids: List[str], primary_id: str) -> None:
+        """Start tracking newly selected calendars and drop deselected ones."""
+        self.primary_id = primary_id
+        if set(calendar_ids) == set(self.stores):
+            return
+        self.stores = {
+            calendar_id: self.stores.get(calendar_id) or EventStore()
+            for calendar_id in calendar_ids
+        }
+        self._generation += 1
+
+    def etag(self, events: List[Dict[str, Any]], *variant: Any) -> str:
+        """
+        Strong ETag for a response made of these events, from the etag
+        Google gives every event revision (or its updated time).
+        """
+        return make_etag(variant, [
+            (event.get('calendarId'), event['id'], event.get('etag') or event.get('updated'))
+            for event in events
+        ])
+
+    def between(self, start: float, end: float) -> List[Dict[str, Any]]:
+        """Events across every calendar overlapping [start, end)."""
+        return [
+            event
+            for store in list(self.stores.values())
+            for event in store.between(start, end)
+        ]
+
+    def upcoming(self, max_results: int, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Upcoming events across every calendar, ordered by start time."""
+        if now is None:
+            now = time.time()
+        return merge_events(
+            [store.upcoming(max_results, now) for store in list(self.stores.values())],
+            max_results
+        )
+
+
+class CalendarSyncEngine:
+    """
+    Keeps a per-user CalendarSet in step with Google: one full sync per
+    calendar, then incremental syncToken syncs whenever the set is older
+    than the caller's freshness bound. Calendars sync concurrently.
+    """
+
+    def __init__(self, max_users: int = SYNC_MAX_USERS, lookback_days: int = SYNC_LOOKBACK_DAYS):
+        self.lookback_days = lookback_days
+        self._stores = TTLCache(maxsize=max_users, ttl=24 * 3600)
+        # Per-user sync locks, bounded like the stores they guard
+        self._locks = TTLCache(maxsize=max_users, ttl=24 * 3600)
+
+    def _lock(self, user_id: str) -> asyncio.Lock:
+        """The user's sync lock. Only used on the event loop, so get-then-set cannot race."""
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks.set(user_id, lock)
+        return lock
+
+    def get_store(self, user_id: str) -> Optional[CalendarSet]:
+        return self._stores.get(user_id)
+
+    def reset(self, user_id: str) -> None:
+        """Forget a user's calendars, e.g. after they connect another account."""
+        self._stores.invalidate(user_id)
+
+    def _refresh_calendars(self, calendars: CalendarSet, service: GoogleCalendarService) -> None:
+        """Re-read the user's selected calendars at most every CALENDAR_LIST_TTL seconds."""
+        if calendars.listed_at is not None and time.monotonic() - calendars.listed_at < CALENDAR_LIST_TTL:
+            return
+        try:
+            entries = service.list_calendars()
+        except Exception as e:
+            if calendars.stores:
+                print(f"Calendar list refresh failed, keeping {len(calendars.stores)} calendars: {str(e)}")
+                return
+            print(f"Calendar list failed, syncing the primary calendar only: {str(e)}")
+            entries = [{'id': 'primary', 'primary': True}]
+
+        primary_id = next((entry['id'] for entry in entries if entry.get('primary')), 'primary')
+        calendars.set_calendars([entry['id'] for entry in entries], primary_id)
+        calendars.listed_at = time.monotonic()
+
+    def _sync_calendar(
+        self,
+        service: GoogleCalendarService,
+        calendar_id: str,
+        store: EventStore,
+        time_min: datetime
+    ) -> None:
+        try:
+            events, next_token = service.list_event_changes(
+                sync_token=store.sync_token, time_min=time_min, calendar_id=calendar_id
+            )
+        except SyncTokenExpired:
+            store.reset()
+            events, next_token = service.list_event_changes(time_min=time_min, calendar_id=calendar_id)
+
+        for event in events:
+            event['calendarId'] = calendar_id
+        store.apply(events)
+        store.prune(time.time() - self.lookback_days * 86400)
+        store.sync_token = next_token
+        store.synced_at = time.monotonic()
+
+    def sync(self, user_id: str, service: GoogleCalendarService) -> CalendarSet:
+        """
+        Blocking sync of one user's calendars. Each calendar runs a full sync
+        when it has no sync token or Google expired it (410), otherwise an
+        incremental one. A calendar that fails keeps its previous contents
+        and is retried on the next sync.
+        """
+        calendars = self._stores.get(user_id)
+        if calendars is None:
+            calendars = CalendarSet()
+            self._stores.set(user_id, calendars)
+
+        self._refresh_calendars(calendars, service)
+
+        time_min = datetime.utcnow() - timedelta(days=self.lookback_days)
+        stores = list(calendars.stores.items())
+        results = run_concurrently(
+            lambda item: self._sync_calendar(service, item[0], item[1], time_min),
+            stores
+        )
+        errors = [
+            (calendar_id, result)
+            for (calendar_id, _), result in zip(stores, results)
+            if isinstance(result, Exception)
+        ]
+        if errors and len(errors) == len(stores):
+            raise errors[0][1]
+        for calendar_id, error in errors:
+            print(f"Calendar sync failed for {calendar_id}: {str(error)}")
+
+        calendars.synced_at = time.monotonic()
+        return calendars
+
+    async def get_fresh_store(
+        self,
+        user_id: str,
+        get_service: Callable[[], Awaitable[GoogleCalendarService]],
+        max_age: float = SYNC_MAX_AGE
+    ) -> CalendarSet:
+        """
+        Return the user's calendars, syncing first if they are older than max_age.
+
+        Args:
+            user_id: User to read
+            get_service: Coroutine factory for the user's calendar service;
+                only called when a sync is actually needed
+            max_age: Freshness bound in seconds
+
+        Returns:
+            CalendarSet no older than max_age, or the stale set if the sync
+            failed and one exists
+        """
+        store = self._stores.get(user_id)
+        if store is not None and store.age() <= max_age:
+            return store
+
+        async with self._lock(user_id):
+            # Another request may have synced while we waited
+            store = self._stores.get(user_id)
+            if store is not None and store.age() <= max_age:
+                return store
+
+            try:
+                service = await get_service()
+                return await asyncio.to_thread(self.sync, user_id, service)
+            except Exception as e:
+                if store is None or store.synced_at is None:
+                    raise
+                print(f"Calendar sync failed, serving cached events: {str(e)}")
+                return store
+
+    def record(self, user_id: str, event: Dict[str, Any], calendar_id: str = 'primary') -> None:
+        """Apply an event written through this API to the user's store."""
+        calendars = self._stores.get(user_id)
+        store = calendars.store(calendar_id) if calendars is not None else None
+        if store is not None and event:
+            event['calendarId'] = calendars.primary_id if calendar_id == 'primary' else calendar_id
+            store.apply([event])
+
+    def cached_etag(self, user_id: str, event_id: str, calendar_id: str = 'primary') -> Optional[str]:
+        """ETag of the user's cached copy of an event, if it is in the store."""
+        calendars = self._stores.get(user_id)
+        store = calendars.store(calendar_id) if calendars is not None else None
+        event = store.get(event_id) if store is not None else None
+        return event.get('etag') if event else None
+
+    def mark_stale(self, user_id: str) -> None:
+        """Make the next read sync, e.g. after an update lost an ETag race."""
+        calendars = self._stores.get(user_id)
+        if calendars is not None:
+            calendars.synced_at = None
+
+    def forget(self, user_id: str, event_id: str, calendar_id: str = 'primary') -> None:
+        """Remove an event deleted through this API from the user's store."""
+        calendars = self._stores.get(user_id)
+        store = calendars.store(calendar_id) if calendars is not None else None
+        if store is not None:
+            store.remove(event_id)
+
+
+calendar_sync = CalendarSyncEngine()
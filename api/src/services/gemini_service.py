@@ -1,12 +1,16 @@
 import google.generativeai as genai
 # from google.generativeai import 
 from pydantic import BaseModel
-from typing import Dict, Any, Callable, List
-import requests
-from bs4 import BeautifulSoup
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+from html.parser import HTMLParser
+import asyncio
+import httpx
 from dotenv import load_dotenv, find_dotenv
 import os
 
+from ..singleflight import single_flight
+from ..utils import TTLCache
+
 # Configure your Gemini API key
 genai.configure(api_key="YOUR_API_KEY")  # Replace with your actual API key
 
@@ -19,78 +23,221 @@ class WebSearchQuery(BaseModel):
 class WebSearchResult(BaseModel):
     results: List[str]
 
-def web_search(query: str) -> WebSearchResult:
-    """Performs a web search and returns snippets from the top results."""
-    try:
-        search_results = []
-        search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(search_url, headers=headers)
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+class BraveSearchResult(BaseModel):
+    results: List[str]
 
-        soup = BeautifulSoup(response.content, "html.parser")
-        result_divs = soup.find_all("div", class_="tF2Cxc")  # Google search result div class
 
-        for result_div in result_divs[:3]:  # Limit to top 3 results
-            try:
-                snippet = result_div.find("div", class_="VwiC3b").text
-                search_results.append(snippet)
-            except AttributeError:
-                pass # some results may not have snippets
+# Backends queried by web_search, in result priority order
+BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
+SEARCH_BACKENDS = [
+    name.strip() for name in
+    os.getenv("SEARCH_BACKENDS", "brave,google" if BRAVE_API_KEY else "google").split(",")
+    if name.strip()
+]
+SEARCH_TOP_N = 3
+# Per-backend deadline in seconds; a slow backend is dropped, not waited on
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "3"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "600"))
 
-        return WebSearchResult(results=search_results)
+GOOGLE_SEARCH_URL = "https://www.google.com/search"
+BRAVE_SEARCH_URL = "https://api.search.brave.com/res/v1/web/search"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
-    except requests.exceptions.RequestException as e:
-        return WebSearchResult(results=[f"Error during web search: {e}"])
-    except Exception as e:
-        return WebSearchResult(results=[f"An unexpected error occurred: {e}"])
+# Results keyed by (normalized query, top_n, backends)
+search_cache = TTLCache(maxsize=1024, ttl=SEARCH_CACHE_TTL)
 
-import requests
-from pydantic import BaseModel
-from typing import List
+_search_client: Optional[httpx.AsyncClient] = None
 
-class BraveSearchResult(BaseModel):
-    results: List[str]
 
-import requests
-from pydantic import BaseModel
-from typing import List
+def get_search_client() -> httpx.AsyncClient:
+    """Keep-alive connection pool shared by every search backend."""
+    global _search_client
+    if _search_client is None or _search_client.is_closed:
+        _search_client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            timeout=SEARCH_TIMEOUT,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=10, keepalive_expiry=60.0)
+        )
+    return _search_client
 
-class BraveSearchResult(BaseModel):
-    results: List[str]
 
-def brave_search(query: str, api_key: str) -> BraveSearchResult:
-    """Performs a search using the Brave Search API."""
-    try:
-        search_url = f"https://api.search.brave.com/api/v1/web?q={query.replace(' ', '+')}"
-        headers = {
+async def close_search_client() -> None:
+    """Close the shared search connection pool; called on app shutdown."""
+    global _search_client
+    if _search_client is not None:
+        await _search_client.aclose()
+        _search_client = None
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as the cache key."""
+    return " ".join(query.lower().split())
+
+
+class GoogleSnippetParser(HTMLParser):
+    """
+    Incremental parser for a Google results page. Collects the snippet of
+    each result (div.VwiC3b inside div.tF2Cxc) and sets `done` once it has
+    `limit` of them, so the caller can stop reading the response.
+    """
+
+    RESULT_CLASS = "tF2Cxc"
+    SNIPPET_CLASS = "VwiC3b"
+
+    def __init__(self, limit: int):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.snippets: List[str] = []
+        self.done = False
+        self._depth = 0
+        self._result_depth = None
+        self._snippet_depth = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "div" or self.done:
+            return
+        self._depth += 1
+        classes = (dict(attrs).get("class") or "").split()
+        if self._result_depth is None and self.RESULT_CLASS in classes:
+            self._result_depth = self._depth
+        elif self._result_depth is not None and self._snippet_depth is None and self.SNIPPET_CLASS in classes:
+            self._snippet_depth = self._depth
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if tag != "div" or self.done:
+            return
+        if self._snippet_depth == self._depth:
+            snippet = "".join(self._text).strip()
+            if snippet:
+                self.snippets.append(snippet)
+            self._snippet_depth = None
+            # One snippet per result
+            self._result_depth = None
+            if len(self.snippets) >= self.limit:
+                self.done = True
+        elif self._result_depth == self._depth:
+            self._result_depth = None
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._snippet_depth is not None:
+            self._text.append(data)
+
+
+async def google_search(query: str, top_n: int = SEARCH_TOP_N) -> List[str]:
+    """
+    Snippets from the top Google results. The page is streamed and parsed
+    as it arrives, and the download stops as soon as top_n snippets are in.
+    """
+    parser = GoogleSnippetParser(top_n)
+    async with get_search_client().stream("GET", GOOGLE_SEARCH_URL, params={"q": query}) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_text():
+            parser.feed(chunk)
+            if parser.done:
+                break
+    return parser.snippets
+
+
+async def brave_search(query: str, api_key: Optional[str] = None, top_n: int = SEARCH_TOP_N) -> BraveSearchResult:
+    """
+    Performs a search using the Brave Search API.
+
+    Raises:
+        ValueError: If no API key is configured
+        httpx.HTTPError: If the request fails; web_search reports it as
+            that backend's error
+    """
+    api_key = api_key or BRAVE_API_KEY
+    if not api_key:
+        raise ValueError("BRAVE_API_KEY is not configured")
+
+    response = await get_search_client().get(
+        BRAVE_SEARCH_URL,
+        params={"q": query, "count": top_n},
+        headers={
             "Accept": "application/json",
             "Accept-Encoding": "gzip",
-            # Change to "Bearer" authentication format
-            "Authorization": f"Bearer {api_key}"
+            "X-Subscription-Token": api_key
         }
-        response = requests.get(search_url, headers=headers)
-        response.raise_for_status()
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    # Web results are under "web"; older responses had them at the top level
+    results = (data.get("web") or {}).get("results") or data.get("results") or []
+    return BraveSearchResult(results=[
+        result["description"] for result in results[:top_n] if "description" in result
+    ])
+
+
+async def _brave_snippets(query: str, top_n: int) -> List[str]:
+    return (await brave_search(query, top_n=top_n)).results
+
+
+SEARCH_FUNCTIONS: Dict[str, Callable[[str, int], Awaitable[List[str]]]] = {
+    "google": google_search,
+    "brave": _brave_snippets
+}
+
+
+async def web_search(
+    query: str,
+    top_n: int = SEARCH_TOP_N,
+    backends: Optional[List[str]] = None
+) -> WebSearchResult:
+    """
+    Performs a web search and returns snippets from the top results.
+
+    Every configured backend is queried concurrently, each under its own
+    deadline; their results are merged in backend order without duplicates.
+    Answers are cached per normalized query, and concurrent identical
+    searches share one set of backend calls.
+
+    Args:
+        query: Search query
+        top_n: Number of snippets to return
+        backends: Backend names (default: SEARCH_BACKENDS)
+
+    Returns:
+        WebSearchResult. If every backend failed, the errors are returned
+        as results (and not cached).
+    """
+    backends = tuple(backends or SEARCH_BACKENDS)
+    key = (normalize_query(query), top_n, backends)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
 
-        print("Raw response:", response.text)  # Print the raw response
-        data = response.json()
-        search_results = []
+    async def run_backend(name):
+        try:
+            return await asyncio.wait_for(SEARCH_FUNCTIONS[name](key[0], top_n), SEARCH_TIMEOUT)
+        except asyncio.TimeoutError:
+            return TimeoutError(f"{name} search timed out after {SEARCH_TIMEOUT}s")
+        except Exception as e:
+            return e
 
-        if "results" in data:
-            for result in data["results"][:3]:
-                if "description" in result:
-                    search_results.append(result["description"])
+    async def fetch():
+        outcomes = await asyncio.gather(*(run_backend(name) for name in backends))
+        results, errors = [], []
+        for name, outcome in zip(backends, outcomes):
+            if isinstance(outcome, Exception):
+                errors.append(f"Error during {name} search: {outcome}")
+                continue
+            for snippet in outcome:
+                if snippet not in results:
+                    results.append(snippet)
 
-        return BraveSearchResult(results=search_results)
+        if errors and not results:
+            return WebSearchResult(results=errors)
+        result = WebSearchResult(results=results[:top_n])
+        search_cache.set(key, result)
+        return result
 
-    except requests.exceptions.HTTPError as e:
-        return BraveSearchResult(results=[f"Error during Brave search: {e}, Response Text: {e.response.text}"])
-    except requests.exceptions.RequestException as e:
-        return BraveSearchResult(results=[f"Error during Brave search: {e}"])
-    except Exception as e:
-        return BraveSearchResult(results=[f"An unexpected error occurred: {e}"])
+    return await single_flight.do("web_search", ("web_search",) + key, fetch)
 
 # Define function declarations for Gemini
 # web_search_func = FunctionDeclaration(
@@ -120,7 +267,7 @@ def brave_search(query: str, api_key: str) -> BraveSearchResult:
 
 #                 if function_name == "web_search":
 #                     params = WebSearchQuery(**arguments)
-#                     function_response = web_search(params.query)
+#                     function_response = asyncio.run(web_search(params.query))
 #                     tool_response = response.candidates[0].content.parts[0].function_call.create_tool_response(function_response.dict())
 #                     final_response = model.generate_content(tool_response)
 #                     return final_response.text
@@ -141,7 +288,4 @@ def brave_search(query: str, api_key: str) -> BraveSearchResult:
 
 if __name__ == '__main__':
     load_dotenv(find_dotenv())
-    BRAVE_API_KEY = os.getenv('BRAVE_API_KEY')
-    print(BRAVE_API_KEY)
-    BRAVE_API_KEY='BSAaf_pCsUjayfV9CLbkIPNNT8oPq_9'
-    print(brave_search('What is the weather today?', BRAVE_API_KEY))
\ No newline at end of file
+    print(asyncio.run(brave_search('What is the weather today?', os.getenv('BRAVE_API_KEY'))))
\ No newline at end of file
@@ -0,0 +1,235 @@
+import os
+import time
+import random
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from ..utils import TTLCache, TokenBucket
+
+
+# (requests per second, burst) allowed per upstream and access token
+UPSTREAM_LIMITS = {
+    "notion": (float(os.getenv("NOTION_RATE_LIMIT", "3")), float(os.getenv("NOTION_RATE_BURST", "3"))),
+    "google": (float(os.getenv("GOOGLE_RATE_LIMIT", "10")), float(os.getenv("GOOGLE_RATE_BURST", "10")))
+}
+MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+
+class UpstreamRateLimited(HTTPException):
+    """An upstream kept answering 429 after all retries."""
+
+    def __init__(self, upstream: str, retry_after: Optional[float]):
+        headers = {"Retry-After": str(int(retry_after + 0.999))} if retry_after else None
+        super().__init__(
+            status_code=429,
+            detail=f"{upstream} rate limit exceeded, try again later",
+            headers=headers
+        )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Read a Retry-After header given in seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def error_status(error: Exception):
+    """
+    Return (status, retry_after) for an upstream error, or (None, None) when
+    it is not an HTTP error. Transport failures are reported as status 0.
+    """
+    # notion_client HTTPResponseError / APIResponseError
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        headers = getattr(error, "headers", None) or {}
+        return status, parse_retry_after(headers.get("retry-after"))
+
+    # googleapiclient HttpError
+    resp = getattr(error, "resp", None)
+    if resp is not None and hasattr(resp, "status"):
+        return int(resp.status), parse_retry_after(resp.get("retry-after"))
+
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return 0, None
+    if type(error).__name__ in ("RequestTimeoutError", "HttpLib2Error", "timeout"):
+        return 0, None
+    return None, None
+
+
+class OutboundLimiter:
+    """
+    The one layer every Notion and Google call goes through: a token bucket
+    per (upstream, token), Retry-After aware handling of 429s, and jittered
+    exponential backoff for transient failures of idempotent calls.
+    """
+
+    def __init__(
+        self,
+        max_buckets: int = 4096,
+        idle_timeout: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_buckets: Maximum number of (upstream, token) buckets kept
+            idle_timeout: Seconds after its last use that a bucket is dropped
+            clock: Monotonic time source for bucket expiry
+        """
+        self.idle_timeout = idle_timeout
+        self._buckets = TTLCache(maxsize=max_buckets, ttl=idle_timeout, clock=clock)
+        self.counters: Dict[str, Dict[str, int]] = {
+            upstream: {"requests": 0, "throttled": 0, "rate_limited": 0, "retries": 0, "failures": 0}
+            for upstream in UPSTREAM_LIMITS
+        }
+
+    def bucket(self, upstream: str, token: str) -> TokenBucket:
+        key = (upstream, token)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, burst = UPSTREAM_LIMITS[upstream]
+            bucket = TokenBucket(rate, burst)
+        # Expire on idleness, not age: an active token keeps its bucket and
+        # any 429 penalty on it, instead of getting a full burst back hourly
+        self._buckets.set(key, bucket)
+        return bucket
+
+    def _retry_delay(self, upstream: str, bucket: TokenBucket, error: Exception, attempt: int, idempotent: bool) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error is final."""
+        status, retry_after = error_status(error)
+        counters = self.counters[upstream]
+        if status == 429:
+            # Rejected before processing, so even writes can be retried
+            counters["rate_limited"] += 1
+            if attempt >= MAX_RETRIES:
+                counters["failures"] += 1
+                raise UpstreamRateLimited(upstream, retry_after) from error
+            # Hold back every caller sharing this token, not just this one;
+            # the retry itself then waits on the bucket
+            bucket.penalize(retry_after if retry_after is not None else self.backoff(attempt))
+            return 0.0
+        if idempotent and status is not None and (status == 0 or status in RETRYABLE_STATUS):
+            if attempt >= MAX_RETRIES:
+                return None
+            return self.backoff(attempt)
+        return None
+
+    @staticmethod
+    def backoff(attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    async def call(
+        self,
+        upstream: str,
+        token: str,
+        fn: Callable[[], Awaitable[Any]],
+        idempotent: bool = True,
+        cost: float = 1
+    ) -> Any:
+        """
+        Run an async upstream call under the token's rate limit.
+
+        Args:
+            upstream: "notion" or "google"
+            token: Access token the call is made with
+            fn: Zero-argument coroutine factory performing the call
+            idempotent: Whether transient failures may be retried
+            cost: Rate limit tokens the call uses, e.g. one per request
+                bundled into a batch
+
+        Returns:
+            The call's result
+        """
+        bucket = self.bucket(upstream, token)
+        counters = self.counters[upstream]
+        attempt = 0
+        while True:
+            if await bucket.acquire(cost):
+                counters["throttled"] += 1
+            counters["requests"] += 1
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._retry_delay(upstream, bucket, e, attempt, idempotent)
+                if delay is None:
+                    counters["failures"] += 1
+                    raise
+            counters["retries"] += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def call_sync(
+        self,
+        upstream: str,
+        token: str,
+        fn: Callable[[], Any],
+        idempotent: bool = True,
+        cost: float = 1
+    ) -> Any:
+        """Blocking counterpart of `call` for SDKs run in worker threads."""
+        bucket = self.bucket(upstream, token)
+        counters = self.counters[upstream]
+        attempt = 0
+        while True:
+            if bucket.acquire_sync(cost):
+                counters["throttled"] += 1
+            counters["requests"] += 1
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._retry_delay(upstream, bucket, e, attempt, idempotent)
+                if delay is None:
+                    counters["failures"] += 1
+                    raise
+            counters["retries"] += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def acquire_sync(self, upstream: str, token: str, cost: float = 1) -> None:
+        """
+        Wait in the calling thread for the rate limit tokens of a request
+        sent without `call_sync`, e.g. before handing it to a worker pool
+        so pool threads never sleep on the bucket.
+        """
+        counters = self.counters[upstream]
+        if self.bucket(upstream, token).acquire_sync(cost):
+            counters["throttled"] += 1
+        counters["requests"] += 1
+
+    def rate_limited(self, upstream: str, token: str, retry_after: Optional[float], attempt: int) -> None:
+        """
+        Record a 429 for a request retried by its caller and hold back the
+        token's bucket for Retry-After, or a jittered backoff without one,
+        as `call` does for its own retries.
+        """
+        counters = self.counters[upstream]
+        counters["rate_limited"] += 1
+        counters["retries"] += 1
+        self.bucket(upstream, token).penalize(retry_after if retry_after is not None else self.backoff(attempt))
+
+    def queued(self, upstream: str) -> int:
+        """Calls currently waiting on a rate limit for this upstream."""
+        return sum(
+            bucket.waiting for (name, _), bucket in self._buckets.items()
+            if name == upstream
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            upstream: {**counters, "queued": self.queued(upstream)}
+            for upstream, counters in self.counters.items()
+        }
+
+
+outbound = OutboundLimiter()
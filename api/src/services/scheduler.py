@@ -0,0 +1,212 @@
+import math
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from ..config.calendar_config import (
+    SCHEDULE_BUFFER_MINUTES,
+    SCHEDULE_DAY_END,
+    SCHEDULE_DAY_START,
+    SCHEDULE_GRANULARITY_MINUTES,
+    SCHEDULE_TASK_MINUTES
+)
+from ..notion.todo_mirror import PRIORITY_RANK
+from .gcal_service import event_time
+
+Interval = Tuple[float, float]
+
+
+def busy_from_events(events: Iterable[Dict[str, Any]]) -> List[Interval]:
+    """
+    Busy intervals from calendar events. Events marked "free"
+    (transparent), cancelled events and invitations the user declined do
+    not block time.
+    """
+    busy = []
+    for event in events:
+        if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+            continue
+        if any(a.get('self') and a.get('responseStatus') == 'declined' for a in event.get('attendees', [])):
+            continue
+        start = event_time(event['start'])
+        busy.append((start, event_time(event.get('end', event['start']))))
+    return busy
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort and coalesce overlapping or touching intervals."""
+    merged: List[List[float]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def working_windows(
+    start: datetime,
+    end: datetime,
+    tz: ZoneInfo,
+    day_start: int = SCHEDULE_DAY_START,
+    day_end: int = SCHEDULE_DAY_END,
+    weekends: bool = False
+) -> List[Interval]:
+    """Working hours of every day in [start, end), in the user's timezone."""
+    windows = []
+    day = start.astimezone(tz).date()
+    last = end.astimezone(tz).date()
+    while day <= last:
+        if weekends or day.weekday() < 5:
+            open_at = datetime.combine(day, time(day_start), tz).timestamp()
+            close_at = datetime.combine(day, time(day_end), tz).timestamp()
+            open_at, close_at = max(open_at, start.timestamp()), min(close_at, end.timestamp())
+            if open_at < close_at:
+                windows.append((open_at, close_at))
+        day += timedelta(days=1)
+    return windows
+
+
+def free_intervals(busy: Iterable[Interval], windows: List[Interval]) -> List[Interval]:
+    """
+    Subtract busy time from the working windows. Both inputs are swept
+    once in order, so this is linear after sorting.
+    """
+    busy = merge_intervals(busy)
+    free = []
+    i = 0
+    for window_start, window_end in windows:
+        cursor = window_start
+        # Skip busy intervals that ended before this window
+        while i < len(busy) and busy[i][1] <= window_start:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < window_end:
+            if busy[j][0] > cursor:
+                free.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if cursor < window_end:
+            free.append((cursor, window_end))
+    return free
+
+
+def deadline(due_date: Optional[str], tz: ZoneInfo, day_end: int = SCHEDULE_DAY_END) -> float:
+    """Latest end time for a todo: the end of the working day it is due, or its exact due time."""
+    if not due_date:
+        return math.inf
+    try:
+        if 'T' in due_date:
+            due = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
+            if due.tzinfo is None:
+                due = due.replace(tzinfo=tz)
+            return due.timestamp()
+        return datetime.combine(date.fromisoformat(due_date), time(day_end), tz).timestamp()
+    except ValueError:
+        return math.inf
+
+
+def plan_schedule(
+    todos: List[Dict[str, Any]],
+    busy: Iterable[Interval],
+    start: datetime,
+    end: datetime,
+    tz: ZoneInfo,
+    duration_minutes: int = SCHEDULE_TASK_MINUTES,
+    buffer_minutes: int = SCHEDULE_BUFFER_MINUTES,
+    granularity_minutes: int = SCHEDULE_GRANULARITY_MINUTES,
+    day_start: int = SCHEDULE_DAY_START,
+    day_end: int = SCHEDULE_DAY_END,
+    weekends: bool = False
+) -> Dict[str, Any]:
+    """
+    Propose a time block for each pending todo.
+
+    Todos are taken earliest deadline first, then by priority, and each is
+    placed first-fit into the earliest free gap that holds it (earliest
+    deadline first is optimal for meeting due dates with equal-length
+    blocks). Block starts are aligned to the granularity. A todo that can
+    only be placed after its due date is flagged late; one that fits
+    nowhere in the window is left unscheduled.
+
+    Args:
+        todos: Todo items as returned by the todo mirror
+        busy: Busy (start, end) timestamps
+        start: Start of the planning window (timezone-aware)
+        end: End of the planning window (timezone-aware)
+        tz: The user's timezone, for working hours and due dates
+        duration_minutes: Length of each block
+        buffer_minutes: Gap kept between a block and any other block or
+            busy event
+        granularity_minutes: Alignment of block starts
+        day_start: Working day start hour
+        day_end: Working day end hour
+        weekends: Whether Saturdays and Sundays are schedulable
+
+    Returns:
+        dict: {'proposals', 'unscheduled', 'free_minutes'}
+    """
+    duration = duration_minutes * 60
+    buffer = buffer_minutes * 60
+    step = max(1, granularity_minutes) * 60
+
+    # Pad busy time so no block starts or ends flush against a meeting
+    padded = [(busy_start - buffer, busy_end + buffer) for busy_start, busy_end in busy]
+    gaps = free_intervals(padded, working_windows(start, end, tz, day_start, day_end, weekends))
+    free_minutes = int(sum(gap_end - gap_start for gap_start, gap_end in gaps) // 60)
+
+    pending = [todo for todo in todos if not todo.get('status')]
+    pending.sort(key=lambda todo: (
+        deadline(todo.get('due_date'), tz, day_end),
+        PRIORITY_RANK.get(todo.get('priority'), len(PRIORITY_RANK)),
+        todo.get('name') or ''
+    ))
+
+    proposals, unscheduled = [], []
+    for todo in pending:
+        due = deadline(todo.get('due_date'), tz, day_end)
+        for index, (gap_start, gap_end) in enumerate(gaps):
+            block_start = math.ceil(gap_start / step) * step
+            block_end = block_start + duration
+            if block_end > gap_end:
+                continue
+
+            # Keep what is left on either side of the block
+            remainder = []
+            if block_start - gap_start >= step:
+                remainder.append((gap_start, block_start))
+            if gap_end - (block_end + buffer) >= step:
+                remainder.append((block_end + buffer, gap_end))
+            gaps[index:index + 1] = remainder
+
+            proposals.append({
+                "todo_id": todo['id'],
+                "name": todo.get('name') or 'Untitled task',
+                "priority": todo.get('priority'),
+                "due_date": todo.get('due_date'),
+                "start": datetime.fromtimestamp(block_start, tz).isoformat(),
+                "end": datetime.fromtimestamp(block_end, tz).isoformat(),
+                "late": block_end > due
+            })
+            break
+        else:
+            unscheduled.append({
+                "todo_id": todo['id'],
+                "name": todo.get('name'),
+                "priority": todo.get('priority'),
+                "due_date": todo.get('due_date')
+            })
+
+    proposals.sort(key=lambda proposal: proposal['start'])
+    return {
+        "proposals": proposals,
+        "unscheduled": unscheduled,
+        "free_minutes": free_minutes
+    }
+
+
+def planning_window(days: int, tz: ZoneInfo, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """From now until the end of the day `days` days ahead, in the user's timezone."""
+    now = (now or datetime.now(timezone.utc)).astimezone(tz)
+    end = datetime.combine(now.date() + timedelta(days=days), time(0), tz)
+    return now, end
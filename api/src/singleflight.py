@@ -0,0 +1,70 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical reads: while a call for a key is in
+    flight, later callers with the same key await its result instead of
+    starting their own upstream fetch.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    async def do(self, name: str, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn, or join the in-flight call with the same key.
+
+        Args:
+            name: Counter group, usually the route
+            key: Identity of the request
+            fn: Zero-argument coroutine factory performing the fetch
+
+        Returns:
+            The shared result. Exceptions are shared too.
+        """
+        counters = self.counters.setdefault(name, {"leaders": 0, "coalesced": 0})
+        task = self._inflight.get(key)
+        if task is None:
+            counters["leaders"] += 1
+            # Run as a task so one caller disconnecting does not cancel the
+            # fetch for everyone waiting on it
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": len(self._inflight),
+            "routes": self.counters
+        }
+
+
+single_flight = SingleFlight()
+
+
+def coalesce(name: str, skip: Optional[Callable[[Dict[str, Any]], bool]] = None):
+    """
+    Opt a read-only route into request coalescing. The key is the route
+    name plus its call arguments.
+
+    Args:
+        name: Route identifier used in the key and counters
+        skip: Predicate on the call's keyword arguments; when true the call
+            bypasses coalescing (e.g. streaming responses)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if skip is not None and skip(kwargs):
+                return await func(*args, **kwargs)
+            key = (name, args, tuple(sorted(kwargs.items())))
+            return await single_flight.do(name, key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -1 +1,257 @@
-pass
\ No newline at end of file
+import json
+import time
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with per-entry TTL and LRU eviction.
+
+    Thread-safe, so it can be shared between the event loop and the
+    threadpool that runs blocking SDK calls.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            maxsize: Maximum number of entries before the least recently
+                used one is evicted
+            ttl: Default time-to-live in seconds
+            clock: Monotonic time source
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if absent/expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key, evicting the LRU entry if full."""
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop key from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of unexpired entries; does not touch LRU order or stats."""
+        now = self._clock()
+        with self._lock:
+            return [
+                (key, value) for key, (expires_at, value) in self._data.items()
+                if expires_at > now
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for hit rate reporting."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter usable from coroutines and worker threads.
+
+    Callers reserve a token up front; when the bucket is empty the balance
+    goes negative and each caller sleeps until its reserved token refills,
+    so waiters are released in arrival order at the configured rate.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (defaults to rate)
+            clock: Monotonic time source
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.waiting = 0
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Take tokens now and return how long the caller must wait."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            self.acquired += 1
+            if self._tokens >= 0:
+                return 0.0
+            self.throttled += 1
+            return -self._tokens / self.rate
+
+    def penalize(self, seconds: float) -> None:
+        """Empty the bucket for the given time, e.g. after a 429 Retry-After."""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self._updated = self._clock()
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """Wait until tokens are available; returns the time spent waiting."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            self.waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self.waiting -= 1
+        return delay
+
+    def acquire_sync(self, tokens: float = 1) -> float:
+        """Blocking acquire for code running in a worker thread."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            self.waiting += 1
+            try:
+                time.sleep(delay)
+            finally:
+                self.waiting -= 1
+        return delay
+
+
+def json_dumps(content: Any) -> bytes:
+    """Compact JSON, through orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with `json_dumps`. Routes return it directly with
+    content that is already plain JSON types, which also skips FastAPI's
+    jsonable_encoder pass over the payload.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Split a comma separated `fields` parameter.
+
+    Returns:
+        The requested fields, or None when no projection was asked for
+
+    Raises:
+        ValueError: If a field is not one of `allowed`
+    """
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return requested
+
+
+def project(item: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """The item's id plus the given fields, where present."""
+    projected = {"id": item["id"]} if "id" in item else {}
+    for field in fields:
+        if field in item:
+            projected[field] = item[field]
+    return projected
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from a fingerprint of a response's contents."""
+    return f'"{hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check, with the weak comparison RFC 9110 specifies for it."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def conditional_response(content: Callable[[], Any], etag: str, if_none_match: Optional[str]) -> Response:
+    """
+    304 Not Modified when the client already holds this ETag, otherwise
+    the content. content is only built and serialized for a full response.
+    """
+    # Clients may store the response but must revalidate before reusing it
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(content(), headers=headers)
@@ -55,15 +55,26 @@ export default function CallLogPage() {
   const fetchConversations = async () => {
     try {
       setIsLoading(true);
-      const response = await fetch(`/api/py/conversations/${user?.id}`);
-      if (!response.ok) {
-        throw new Error('Failed to fetch conversations');
-      }
-      const data = await response.json();
+      // The history is paginated; follow next_cursor until the last page
+      const conversationIds: string[] = [];
+      let cursor: string | null = null;
+      do {
+        const params = new URLSearchParams({ limit: '100' });
+        if (cursor) {
+          params.set('cursor', cursor);
+        }
+        const response = await fetch(`/api/py/conversations/${user?.id}?${params}`);
+        if (!response.ok) {
+          throw new Error('Failed to fetch conversations');
+        }
+        const data = await response.json();
+        conversationIds.push(...data.conversation_ids);
+        cursor = data.next_cursor;
+      } while (cursor);
 
       // Fetch details for all conversations in parallel
       const conversationsWithDetails = await Promise.all(
-        data.conversation_ids.map(async (id: string) => {
+        conversationIds.map(async (id: string) => {
           const duration = await fetchConversationDetails(id);
           return {
             conversation_id: id,
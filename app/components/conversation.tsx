@@ -162,7 +162,7 @@ export function ConvAI() {
       const clientTools = {
         list_events: async () => {
           console.log('Calling list_events');
-          const response = await fetch(`/api/py/calendar/events?user_id=${user?.id}`);
+          const response = await fetch(`/api/py/calendar/events?user_id=${user?.id}&fields=summary,start,end,status`);
           const data = await response.json();
           console.log(data);
           return JSON.stringify(data);
@@ -195,7 +195,7 @@ export function ConvAI() {
 
         get_tasks: async () => {
           console.log('Calling get_tasks');
-          const response = await fetch(`/api/py/get-todo-list/${user?.id}`);
+          const response = await fetch(`/api/py/get-todo-list/${user?.id}?fields=name,status,priority,due_date`);
           const data = await response.json();
           console.log(data);
           return JSON.stringify(data);
@@ -0,0 +1,545 @@
+"""
+Local stand-ins for PostgREST (Supabase), the Notion API and the Google
+Calendar API, served from one process so the app can be benchmarked without
+touching real services.
+
+Routes are mounted under the same prefixes as the real APIs, so the app only
+needs its base URLs pointed here:
+
+    SUPABASE_URL=http://127.0.0.1:<port>
+    NOTION_BASE_URL=http://127.0.0.1:<port>
+    GOOGLE_CALENDAR_API_ENDPOINT=http://127.0.0.1:<port>/calendar/v3/
+
+Run standalone with `python -m benchmarks.fakes --port 8800`.
+"""
+import argparse
+import asyncio
+import email.parser
+import itertools
+import json
+import random
+import threading
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+UPSTREAMS = ("supabase", "notion", "google")
+
+# Conflict target used for upserts without an explicit on_conflict
+PRIMARY_KEYS = {
+    "users": "user_id",
+    "notion_integrations": "user_id",
+    "conversations": "conversation_id"
+}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class FaultProfile:
+    """
+    Latency and error injection for one upstream.
+
+    Args:
+        latency_ms: Mean added latency
+        jitter_ms: Uniform +/- jitter around the mean
+        error_rate: Fraction of requests answered with a 503
+        rate_limit_rate: Fraction of requests answered with a 429
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+
+    def delay(self) -> float:
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def fault(self) -> Optional[Response]:
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return JSONResponse(
+                {"object": "error", "status": 429, "code": "rate_limited", "message": "Slow down"},
+                status_code=429,
+                headers={"Retry-After": "1"}
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            return JSONResponse(
+                {"object": "error", "status": 503, "code": "service_unavailable", "message": "Injected failure"},
+                status_code=503
+            )
+        return None
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(vars(self))
+
+
+def parse_profiles(specs: List[str]) -> Dict[str, FaultProfile]:
+    """
+    Parse `upstream:key=value,...` specs, e.g.
+    `notion:latency_ms=120,jitter_ms=40,rate_limit_rate=0.01`.
+    The upstream `all` applies to every upstream.
+    """
+    profiles = {name: FaultProfile() for name in UPSTREAMS}
+    for spec in specs or []:
+        name, _, settings = spec.partition(":")
+        targets = UPSTREAMS if name == "all" else (name,)
+        for target in targets:
+            if target not in profiles:
+                raise ValueError(f"Unknown upstream {target!r}, expected one of {UPSTREAMS}")
+            for setting in filter(None, settings.split(",")):
+                key, _, value = setting.partition("=")
+                if not hasattr(profiles[target], key):
+                    raise ValueError(f"Unknown fault setting {key!r}")
+                setattr(profiles[target], key, float(value))
+    return profiles
+
+
+class FakeState:
+    """In-memory data shared by the three stand-ins."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.ids = itertools.count(1)
+        # Notion: database_id -> ordered page list and property schema, page_id -> appended blocks
+        self.databases: Dict[str, List[Dict[str, Any]]] = {}
+        self.schemas: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.blocks: Dict[str, int] = {}
+        # Calendar: (token, calendar_id) -> {event_id: event}, plus a change sequence for sync tokens
+        self.calendars: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self.sequence = itertools.count(1)
+
+
+def add_fault_injection(app: FastAPI, upstream: str, profiles: Dict[str, FaultProfile]) -> None:
+    @app.middleware("http")
+    async def inject(request: Request, call_next):
+        profile = profiles[upstream]
+        delay = profile.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        fault = profile.fault()
+        if fault is not None:
+            return fault
+        return await call_next(request)
+
+
+def postgrest_app(state: FakeState, profiles: Dict[str, FaultProfile]) -> FastAPI:
+    """Just enough of PostgREST for supabase-py selects, inserts and upserts."""
+    app = FastAPI()
+    add_fault_injection(app, "supabase", profiles)
+
+    def matches(row, filters):
+        for column, (op, value) in filters.items():
+            cell = row.get(column)
+            cell = "" if cell is None else str(cell)
+            if op == "eq" and cell != value:
+                return False
+            if op == "lt" and not cell < value:
+                return False
+            if op == "gt" and not cell > value:
+                return False
+            if op == "lte" and not cell <= value:
+                return False
+            if op == "gte" and not cell >= value:
+                return False
+        return True
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        filters, order, limit, offset = {}, [], None, 0
+        for key, value in request.query_params.multi_items():
+            if key == "select":
+                continue
+            if key == "order":
+                for part in value.split(","):
+                    column, _, direction = part.partition(".")
+                    order.append((column, direction.startswith("desc")))
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            else:
+                op, _, operand = value.partition(".")
+                filters[key] = (op, operand)
+
+        with state.lock:
+            rows = [row for row in state.tables.get(table, []) if matches(row, filters)]
+        for column, desc in reversed(order):
+            rows.sort(key=lambda row: str(row.get(column) or ""), reverse=desc)
+        rows = rows[offset:offset + limit if limit is not None else None]
+        return rows
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request):
+        payload = await request.json()
+        rows = payload if isinstance(payload, list) else [payload]
+        prefer = request.headers.get("prefer", "")
+        upsert = "resolution=merge-duplicates" in prefer
+        conflict = request.query_params.get("on_conflict") or PRIMARY_KEYS.get(table)
+
+        written = []
+        with state.lock:
+            stored = state.tables.setdefault(table, [])
+            for row in rows:
+                existing = None
+                if upsert and conflict:
+                    keys = conflict.split(",")
+                    existing = next(
+                        (r for r in stored if all(r.get(k) == row.get(k) for k in keys)),
+                        None
+                    )
+                if existing is not None:
+                    existing.update(row)
+                    written.append(dict(existing))
+                else:
+                    new_row = {"id": next(state.ids), "created_at": now_iso(), **row}
+                    stored.append(new_row)
+                    written.append(dict(new_row))
+        return JSONResponse(written, status_code=201)
+
+    return app
+
+
+def notion_app(state: FakeState, profiles: Dict[str, FaultProfile]) -> FastAPI:
+    """The Notion endpoints the app uses: OAuth, search, pages, databases, blocks."""
+    app = FastAPI()
+    add_fault_injection(app, "notion", profiles)
+
+    def page_object(page_id, parent, properties):
+        return {
+            "object": "page",
+            "id": page_id,
+            "parent": parent,
+            "created_time": now_iso(),
+            "last_edited_time": now_iso(),
+            "archived": False,
+            "in_trash": False,
+            "properties": properties
+        }
+
+    @app.post("/v1/oauth/token")
+    async def oauth_token(request: Request):
+        body = await request.json()
+        return {
+            "access_token": f"secret_{body.get('code') or uuid.uuid4().hex}",
+            "token_type": "bearer",
+            "bot_id": str(uuid.uuid4()),
+            "workspace_id": str(uuid.uuid4()),
+            "workspace_name": "Benchmark workspace"
+        }
+
+    @app.post("/v1/search")
+    async def search(request: Request):
+        return {
+            "object": "list",
+            "results": [page_object("root-page", {"type": "workspace", "workspace": True}, {})],
+            "has_more": False,
+            "next_cursor": None
+        }
+
+    @app.post("/v1/pages")
+    async def create_page(request: Request):
+        body = await request.json()
+        page_id = str(uuid.uuid4())
+        properties = body.get("properties", {})
+        database_id = body.get("parent", {}).get("database_id")
+        if database_id:
+            # Notion returns every database property, empty ones included
+            properties = {"Due Date": {"date": None}, **properties}
+        page = page_object(page_id, body.get("parent"), properties)
+        with state.lock:
+            if database_id:
+                state.databases.setdefault(database_id, []).append(page)
+            state.blocks[page_id] = len(body.get("children", []))
+        return page
+
+    @app.post("/v1/databases")
+    async def create_database(request: Request):
+        body = await request.json()
+        database_id = str(uuid.uuid4())
+        # Title properties have the id "title"; others get short random ids
+        properties = {
+            name: {**prop, "id": "title" if "title" in prop else uuid.uuid4().hex[:4], "name": name}
+            for name, prop in body.get("properties", {}).items()
+        }
+        with state.lock:
+            state.databases[database_id] = []
+            state.schemas[database_id] = properties
+        return {"object": "database", "id": database_id, "properties": properties}
+
+    @app.get("/v1/databases/{database_id}")
+    async def retrieve_database(database_id: str):
+        with state.lock:
+            properties = state.schemas.get(database_id)
+        if properties is None:
+            return JSONResponse({"object": "error", "status": 404, "code": "object_not_found", "message": "Not found"}, status_code=404)
+        return {"object": "database", "id": database_id, "properties": properties}
+
+    @app.post("/v1/databases/{database_id}/query")
+    async def query_database(database_id: str, request: Request):
+        body = await request.json() if await request.body() else {}
+        with state.lock:
+            pages = list(state.databases.get(database_id, []))
+        since = (body.get("filter") or {}).get("last_edited_time", {}).get("on_or_after")
+        if since:
+            pages = [page for page in pages if page["last_edited_time"] >= since]
+        start = int(body.get("start_cursor") or 0)
+        size = min(int(body.get("page_size", 100)), 100)
+        end = start + size
+        results = pages[start:end]
+        wanted = request.query_params.getlist("filter_properties")
+        if wanted:
+            schema = state.schemas.get(database_id, {})
+            names = {name for name, prop in schema.items() if prop["id"] in wanted}
+            results = [
+                {**page, "properties": {k: v for k, v in page["properties"].items() if k in names}}
+                for page in results
+            ]
+        return {
+            "object": "list",
+            "results": results,
+            "has_more": end < len(pages),
+            "next_cursor": str(end) if end < len(pages) else None
+        }
+
+    @app.patch("/v1/blocks/{block_id}/children")
+    async def append_children(block_id: str, request: Request):
+        body = await request.json()
+        with state.lock:
+            state.blocks[block_id] = state.blocks.get(block_id, 0) + len(body.get("children", []))
+        return {"object": "list", "results": body.get("children", []), "has_more": False}
+
+    return app
+
+
+def calendar_app(state: FakeState, profiles: Dict[str, FaultProfile]) -> FastAPI:
+    """Events on the primary calendar, including incremental sync tokens."""
+    app = FastAPI()
+    add_fault_injection(app, "google", profiles)
+
+    def calendar(request: Request) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        calendar_id = request.path_params.get("calendar_id", "primary")
+        with state.lock:
+            return token, state.calendars.setdefault((token, calendar_id), {})
+
+    def stamp(event):
+        event["updated"] = now_iso()
+        event["_seq"] = next(state.sequence)
+        return event
+
+    def public(event):
+        return {k: v for k, v in event.items() if not k.startswith("_")}
+
+    @app.get("/calendar/v3/users/me/calendarList")
+    async def calendar_list(request: Request):
+        # Every user has their primary calendar plus a shared team calendar
+        return {
+            "kind": "calendar#calendarList",
+            "items": [
+                {"id": "primary", "summary": "Personal", "primary": True, "selected": True, "accessRole": "owner"},
+                {"id": "team", "summary": "Team", "selected": True, "accessRole": "reader"}
+            ]
+        }
+
+    @app.post("/calendar/v3/freeBusy")
+    async def free_busy(request: Request):
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        body = await request.json()
+        time_min, time_max = body["timeMin"][:19], body["timeMax"][:19]
+        calendars = {}
+        with state.lock:
+            for item in body.get("items", []):
+                events = state.calendars.get((token, item["id"]), {}).values()
+                calendars[item["id"]] = {"busy": [
+                    {"start": e["start"]["dateTime"], "end": e["end"]["dateTime"]}
+                    for e in events
+                    if e.get("status") != "cancelled"
+                    and e["end"]["dateTime"][:19] > time_min and e["start"]["dateTime"][:19] < time_max
+                ]}
+        return {"kind": "calendar#freeBusy", "timeMin": body["timeMin"], "timeMax": body["timeMax"], "calendars": calendars}
+
+    @app.get("/calendar/v3/calendars/{calendar_id}/events")
+    async def list_events(calendar_id: str, request: Request):
+        _, events = calendar(request)
+        params = request.query_params
+        with state.lock:
+            items = sorted(events.values(), key=lambda e: e["_seq"])
+            latest = max((e["_seq"] for e in items), default=0)
+        sync_token = params.get("syncToken")
+        if sync_token:
+            items = [e for e in items if e["_seq"] > int(sync_token)]
+        else:
+            if params.get("showDeleted") != "true":
+                items = [e for e in items if e.get("status") != "cancelled"]
+            time_min = params.get("timeMin")
+            if time_min:
+                items = [e for e in items if e["end"]["dateTime"] >= time_min[:19]]
+            if params.get("orderBy") == "startTime":
+                items.sort(key=lambda e: e["start"]["dateTime"])
+
+        start = int(params.get("pageToken") or 0)
+        size = int(params.get("maxResults") or 250)
+        end = start + size
+        body = {"kind": "calendar#events", "items": [public(e) for e in items[start:end]]}
+        if end < len(items):
+            body["nextPageToken"] = str(end)
+        else:
+            body["nextSyncToken"] = str(latest)
+        return body
+
+    @app.post("/calendar/v3/calendars/{calendar_id}/events")
+    async def insert_event(calendar_id: str, request: Request):
+        _, events = calendar(request)
+        body = await request.json()
+        event = {
+            **{k: v for k, v in body.items() if v is not None},
+            "id": uuid.uuid4().hex,
+            "status": "confirmed",
+            "etag": f'"{uuid.uuid4().int % 10 ** 16}"',
+            "htmlLink": "https://calendar.google.com/event"
+        }
+        with state.lock:
+            events[event["id"]] = stamp(event)
+        return public(event)
+
+    @app.get("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+    async def get_event(calendar_id: str, event_id: str, request: Request):
+        _, events = calendar(request)
+        event = events.get(event_id)
+        if event is None or event.get("status") == "cancelled":
+            return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+        return public(event)
+
+    @app.api_route("/calendar/v3/calendars/{calendar_id}/events/{event_id}", methods=["PUT", "PATCH"])
+    async def update_event(calendar_id: str, event_id: str, request: Request):
+        _, events = calendar(request)
+        body = await request.json()
+        with state.lock:
+            event = events.get(event_id)
+            if event is None:
+                return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+            if_match = request.headers.get("if-match")
+            if if_match and if_match != event["etag"]:
+                return JSONResponse({"error": {"code": 412, "message": "Precondition Failed"}}, status_code=412)
+            event.update({k: v for k, v in body.items() if k not in ("id", "etag")})
+            event["etag"] = f'"{uuid.uuid4().int % 10 ** 16}"'
+            stamp(event)
+        return public(event)
+
+    @app.delete("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+    async def delete_event(calendar_id: str, event_id: str, request: Request):
+        _, events = calendar(request)
+        with state.lock:
+            event = events.get(event_id)
+            if event is None:
+                return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+            event["status"] = "cancelled"
+            stamp(event)
+        return Response(status_code=204)
+
+    @app.post("/batch/calendar/v3")
+    async def batch(request: Request):
+        """
+        multipart/mixed batch: every part is replayed against this app and
+        answered in its own part, inheriting the outer Authorization header.
+        """
+        content_type = request.headers["content-type"]
+        message = email.parser.BytesParser().parsebytes(
+            f"content-type: {content_type}\r\n\r\n".encode() + await request.body()
+        )
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://calendar") as client:
+            for part in message.get_payload():
+                request_line, raw = part.get_payload().split("\n", 1)
+                method, target, _ = request_line.split(" ")
+                inner = email.parser.Parser().parsestr(raw)
+                headers = {k: v for k, v in inner.items() if k.lower() not in ("host", "content-length", "mime-version")}
+                headers.setdefault("authorization", request.headers.get("authorization", ""))
+                body = inner.get_payload()
+                response = await client.request(method, target, headers=headers, content=body.encode() if body else None)
+                parts.append(
+                    f"--{boundary}\r\n"
+                    f"Content-Type: application/http\r\n"
+                    f"Content-ID: <response-{part['Content-ID'][1:]}\r\n\r\n"
+                    f"HTTP/1.1 {response.status_code} {HTTPStatus(response.status_code).phrase}\r\n"
+                    f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                    f"{response.text}\r\n"
+                )
+        return Response(
+            "".join(parts) + f"--{boundary}--\r\n",
+            media_type=f"multipart/mixed; boundary={boundary}"
+        )
+
+    return app
+
+
+def create_app(profiles: Optional[Dict[str, FaultProfile]] = None) -> FastAPI:
+    """One ASGI app serving all three stand-ins under their real path prefixes."""
+    profiles = profiles or parse_profiles([])
+    state = FakeState()
+    app = FastAPI()
+    app.state.fakes = state
+
+    supabase, notion, google = (
+        postgrest_app(state, profiles),
+        notion_app(state, profiles),
+        calendar_app(state, profiles)
+    )
+
+    # Dispatch on prefix rather than mounting, so each stand-in sees the
+    # full path and keeps its own fault-injection middleware
+    async def dispatch(scope, receive, send):
+        path = scope.get("path", "")
+        if path.startswith("/rest/"):
+            return await supabase(scope, receive, send)
+        if path.startswith(("/calendar/", "/batch/")):
+            return await google(scope, receive, send)
+        if path.startswith("/v1/"):
+            return await notion(scope, receive, send)
+        return await app(scope, receive, send)
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True, "profiles": {name: p.to_dict() for name, p in profiles.items()}}
+
+    dispatch.state = state
+    return dispatch
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument(
+        "--fault", action="append", default=[],
+        help="upstream:key=value,... e.g. notion:latency_ms=120,jitter_ms=40,error_rate=0.01"
+    )
+    args = parser.parse_args()
+
+    profiles = parse_profiles(args.fault)
+    print(json.dumps({name: p.to_dict() for name, p in profiles.items()}))
+    uvicorn.run(create_app(profiles), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cold-start report for the serverless entry point.
+
+Imports api.index in fresh interpreters with `python -X importtime`, prints
+the median import time and the slowest modules, and exits with status 1 if
+the import goes over budget or pulls in an SDK that should load lazily.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 800 --runs 7 --top 25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_POINT = "api.index"
+
+# Default budget for importing the entry point, in milliseconds
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+# SDKs that are built on first use and must not be imported at startup
+LAZY_MODULES = (
+    "supabase",
+    "gotrue",
+    "storage3",
+    "realtime",
+    "googleapiclient.discovery",
+    "google.oauth2.credentials",
+    "google_auth_httplib2",
+    "httplib2"
+)
+
+# (self_us, cumulative_us, depth)
+ImportTimes = Dict[str, Tuple[int, int, int]]
+
+
+def measure(entry_point: str = ENTRY_POINT) -> ImportTimes:
+    """Import the entry point in a fresh interpreter and parse -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry_point}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {entry_point} failed:\n{result.stderr[-2000:]}")
+
+    times: ImportTimes = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return times
+
+
+def report(runs: List[ImportTimes], entry_point: str, top: int) -> Dict[str, object]:
+    totals = [run[entry_point][1] / 1000 for run in runs]
+    last = runs[-1]
+    slowest = sorted(
+        ((name, cumulative / 1000) for name, (_, cumulative, depth) in last.items() if depth == 1),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+    heaviest = sorted(
+        ((name, self_us / 1000) for name, (self_us, _, _) in last.items()),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+    return {
+        "entry_point": entry_point,
+        "runs": len(runs),
+        "median_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "direct_imports_ms": [(name, round(ms, 1)) for name, ms in slowest],
+        "self_time_ms": [(name, round(ms, 1)) for name, ms in heaviest],
+        "eager_lazy_modules": sorted(name for name in LAZY_MODULES if name in last)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entry-point", default=ENTRY_POINT)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=15, help="Modules to list")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Fail above this median")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    runs = [measure(args.entry_point) for _ in range(args.runs)]
+    result = report(runs, args.entry_point, args.top)
+    result["budget_ms"] = args.budget_ms
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import {args.entry_point}: median {result['median_ms']}ms "
+              f"(min {result['min_ms']}, max {result['max_ms']}) over {args.runs} runs, budget {args.budget_ms:.0f}ms")
+        print("\nSlowest direct imports (cumulative ms):")
+        for name, ms in result["direct_imports_ms"]:
+            print(f"  {ms:>8.1f}  {name}")
+        print("\nHeaviest modules (self ms):")
+        for name, ms in result["self_time_ms"]:
+            print(f"  {ms:>8.1f}  {name}")
+
+    failures = []
+    if result["median_ms"] > args.budget_ms:
+        failures.append(f"median import time {result['median_ms']}ms exceeds budget {args.budget_ms:.0f}ms")
+    if result["eager_lazy_modules"]:
+        failures.append(f"imported at startup but should load lazily: {', '.join(result['eager_lazy_modules'])}")
+    if failures:
+        for failure in failures:
+            print(f"\nFAIL: {failure}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Load-test the FastAPI app against local stand-ins for Supabase, Notion and
+Google Calendar.
+
+Starts benchmarks.fakes and the app (uvicorn api.index:app) as subprocesses,
+onboards a pool of virtual users, drives a weighted mix of scenarios, and
+reports p50/p95/p99 latency and requests/sec per route.
+
+    python -m benchmarks.run --duration 30 --concurrency 32
+    python -m benchmarks.run --fault notion:latency_ms=150,jitter_ms=50 --save-baseline notion-150ms
+    python -m benchmarks.run --fault notion:latency_ms=150,jitter_ms=50 --compare notion-150ms
+
+--compare exits with status 1 when a route's p95 or throughput regressed
+beyond --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import parse_profiles
+from benchmarks.workload import Recorder, VirtualUser, drive, onboard, parse_mix
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+# supabase-py only checks the key looks like a JWT
+DUMMY_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.benchmark"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(recorder: Recorder) -> Dict[str, Any]:
+    """Per-route and overall latency (ms), error counts and throughput."""
+    duration = recorder.duration
+
+    def stats(samples):
+        latencies = sorted(seconds * 1000 for seconds, _ in samples)
+        errors = sum(1 for _, status in samples if status == 0 or status >= 400)
+        return {
+            "count": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "rps": round(len(samples) / duration, 2) if duration else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0
+        }
+
+    routes = {route: stats(samples) for route, samples in sorted(recorder.samples.items())}
+    everything = [sample for samples in recorder.samples.values() for sample in samples]
+    return {"duration_s": round(duration, 2), "routes": routes, "total": stats(everything)}
+
+
+def print_report(summary: Dict[str, Any]) -> None:
+    header = f"{'route':<28}{'count':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(summary["routes"].items()) + [("TOTAL", summary["total"])]
+    for route, s in rows:
+        print(
+            f"{route:<28}{s['count']:>8}{s['errors']:>6}{s['rps']:>9.1f}"
+            f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}"
+        )
+    print(f"\nLatencies in ms over {summary['duration_s']}s")
+
+
+def compare(summary: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Routes whose p95 latency grew, or throughput or error rate worsened,
+    by more than the tolerance relative to the baseline.
+    """
+    regressions = []
+    for route, base in baseline["routes"].items():
+        current = summary["routes"].get(route)
+        if current is None or not base["count"]:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: rps {base['rps']} -> {current['rps']}")
+        if current["error_rate"] > base["error_rate"] + tolerance / 10:
+            regressions.append(f"{route}: error rate {base['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up within {timeout}s")
+            await asyncio.sleep(0.1)
+
+
+def start_processes(args, workdir: str):
+    """Launch the stand-ins and the app; returns (app_url, processes)."""
+    fake_port, app_port = free_port(), free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+
+    fake_cmd = [sys.executable, "-m", "benchmarks.fakes", "--port", str(fake_port)]
+    for spec in args.fault:
+        fake_cmd += ["--fault", spec]
+
+    env = {
+        **os.environ,
+        "SUPABASE_URL": fake_url,
+        "SUPABASE_KEY": DUMMY_SUPABASE_KEY,
+        "NOTION_BASE_URL": fake_url,
+        "GOOGLE_CALENDAR_API_ENDPOINT": f"{fake_url}/calendar/v3/",
+        "NOTION_CLIENT_ID": "benchmark",
+        "NOTION_CLIENT_SECRET": "benchmark",
+        "OUTBOX_PATH": os.path.join(workdir, "outbox.sqlite3")
+    }
+    for setting in args.app_env:
+        key, _, value = setting.partition("=")
+        env[key] = value
+
+    app_cmd = [
+        sys.executable, "-m", "uvicorn", "api.index:app",
+        "--host", "127.0.0.1", "--port", str(app_port),
+        "--log-level", "warning", "--no-access-log",
+        "--workers", str(args.workers)
+    ]
+
+    log = open(os.path.join(workdir, "app.log"), "w")
+    processes = [
+        subprocess.Popen(fake_cmd, cwd=ROOT, stdout=subprocess.DEVNULL),
+        subprocess.Popen(app_cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    ]
+    return f"{fake_url}/health", f"http://127.0.0.1:{app_port}", processes
+
+
+async def run(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    parse_profiles(args.fault)  # fail fast on a bad --fault
+
+    workdir = tempfile.mkdtemp(prefix="switch-it-up-bench-")
+    processes = []
+    try:
+        if args.target:
+            app_url = args.target
+        else:
+            fake_health, app_url, processes = start_processes(args, workdir)
+            await wait_until_up(fake_health)
+        await wait_until_up(f"{app_url}/api/py/helloFastApi")
+
+        limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=args.timeout) as client:
+            users = [VirtualUser(f"bench-{i:05d}") for i in range(args.users)]
+            setup = Recorder()
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def setup_user(user):
+                async with semaphore:
+                    return await onboard(client, setup, user)
+
+            ready = await asyncio.gather(*(setup_user(user) for user in users))
+            users = [user for user, ok in zip(users, ready) if ok]
+            print(f"Onboarded {len(users)}/{args.users} users in {setup.duration:.1f}s")
+            if not users:
+                raise RuntimeError(f"No users could be onboarded; see {workdir}/app.log")
+
+            if args.warmup:
+                await drive(client, Recorder(), users, mix, args.concurrency, args.warmup, args.rate)
+
+            recorder = Recorder()
+            await drive(client, recorder, users, mix, args.concurrency, args.duration, args.rate)
+            recorder.stop()
+
+        summary = summarize(recorder)
+        summary["meta"] = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "users": len(users),
+            "workers": args.workers,
+            "faults": args.fault,
+            "target": args.target
+        }
+        return summary
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed-loop workers")
+    parser.add_argument("--rate", type=float, default=None, help="Target scenarios/sec (default: as fast as possible)")
+    parser.add_argument("--users", type=int, default=20, help="Virtual users onboarded before the run")
+    parser.add_argument("--mix", default="mixed", help="mixed, reads, writes, onboarding or scenario=weight,...")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the app")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request client timeout")
+    parser.add_argument(
+        "--fault", action="append", default=[],
+        help="Stand-in latency/errors: upstream:key=value,... (repeatable; upstream is supabase, notion, google or all)"
+    )
+    parser.add_argument("--app-env", action="append", default=[], help="Extra KEY=VALUE for the app process")
+    parser.add_argument("--target", help="Benchmark an already running app at this URL instead")
+    parser.add_argument("--output", help="Write the full results as JSON")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Save results as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare against benchmarks/baselines/NAME.json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression for --compare")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    print_report(summary)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2))
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        path.write_text(json.dumps(summary, indent=2))
+        print(f"Saved baseline to {path}")
+    if args.compare:
+        baseline = json.loads((BASELINE_DIR / f"{args.compare}.json").read_text())
+        regressions = compare(summary, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
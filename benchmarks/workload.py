@@ -0,0 +1,201 @@
+"""
+Mixed workloads for the benchmark runner. Each scenario is one user action
+against the app and may issue several requests; every request is recorded
+under its route name.
+"""
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+
+class Recorder:
+    """Collects (route, seconds, status) samples during a run."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, int]]] = {}
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.samples.setdefault(route, []).append((time.perf_counter() - start, status))
+        return response
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+
+class VirtualUser:
+    """A user with Notion and Google connected, created during setup."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.google_token = f"ya29.{uuid.uuid4().hex}"
+
+
+async def onboard(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, wait: bool = True) -> bool:
+    """Sign up, connect Notion and Google, and optionally wait for provisioning."""
+    await recorder.request(client, "POST /user", "POST", "/api/py/user", json={
+        "user_id": user.user_id,
+        "email": f"{user.user_id}@example.com",
+        "name": user.user_id
+    })
+    response = await recorder.request(client, "POST /notion/callback", "POST", "/api/py/notion/callback", json={
+        "code": uuid.uuid4().hex,
+        "user_id": user.user_id,
+        "redirect_uri": "http://localhost:3000/notion/callback"
+    })
+    await recorder.request(client, "POST /google-calendars", "POST", "/api/py/google-calendars", json={
+        "user_id": user.user_id,
+        "access_token": user.google_token
+    })
+    if response is None or response.status_code != 200 or not wait:
+        return response is not None and response.status_code == 200
+
+    for _ in range(100):
+        status = await recorder.request(
+            client, "GET /notion/provisioning", "GET", f"/api/py/notion/provisioning/{user.user_id}"
+        )
+        state = status.json().get("state") if status is not None and status.status_code == 200 else None
+        if state == "ready":
+            return True
+        if state == "failed":
+            return False
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def onboarding(client, recorder, users: List[VirtualUser]) -> None:
+    await onboard(client, recorder, VirtualUser(f"bench-new-{uuid.uuid4().hex[:12]}"), wait=False)
+
+
+async def todo_read(client, recorder, users: List[VirtualUser]) -> None:
+    user = random.choice(users)
+    await recorder.request(client, "GET /get-todo-list", "GET", f"/api/py/get-todo-list/{user.user_id}")
+
+
+async def todo_write(client, recorder, users: List[VirtualUser]) -> None:
+    user = random.choice(users)
+    due = (datetime.now(timezone.utc) + timedelta(days=random.randint(0, 14))).date().isoformat()
+    await recorder.request(client, "POST /add-todo-list", "POST", "/api/py/add-todo-list", json={
+        "user_id": user.user_id,
+        "name": f"Task {uuid.uuid4().hex[:8]}",
+        "priority": random.choice(["High", "Medium", "Low"]),
+        "due_date": due
+    })
+
+
+async def conversation_save(client, recorder, users: List[VirtualUser]) -> None:
+    user = random.choice(users)
+    # Transcripts of a few hundred to a few thousand words
+    words = " ".join(random.choice(["calm", "focus", "plan", "breathe", "next", "step"]) for _ in range(random.randint(300, 3000)))
+    await recorder.request(client, "POST /add-conv-hist", "POST", "/api/py/add-conv-hist", json={
+        "user_id": user.user_id,
+        "title": f"Conversation {uuid.uuid4().hex[:8]}",
+        "content": words
+    })
+
+
+async def calendar_list(client, recorder, users: List[VirtualUser]) -> None:
+    user = random.choice(users)
+    await recorder.request(
+        client, "GET /calendar/events", "GET", "/api/py/calendar/events",
+        params={"user_id": user.user_id, "max_results": 10}
+    )
+
+
+async def calendar_create(client, recorder, users: List[VirtualUser]) -> None:
+    user = random.choice(users)
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=random.randint(1, 24 * 14))
+    await recorder.request(client, "POST /calendar/events", "POST", "/api/py/calendar/events", json={
+        "user_id": user.user_id,
+        "summary": "Focus block",
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(minutes=30)).isoformat()
+    })
+
+
+Scenario = Callable[[httpx.AsyncClient, Recorder, List[VirtualUser]], Awaitable[None]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "onboarding": onboarding,
+    "todo_read": todo_read,
+    "todo_write": todo_write,
+    "conversation_save": conversation_save,
+    "calendar_list": calendar_list,
+    "calendar_create": calendar_create
+}
+
+# Relative weights of each scenario in a named mix
+MIXES: Dict[str, Dict[str, int]] = {
+    "mixed": {
+        "onboarding": 2,
+        "todo_read": 35,
+        "todo_write": 12,
+        "conversation_save": 10,
+        "calendar_list": 35,
+        "calendar_create": 6
+    },
+    "reads": {"todo_read": 50, "calendar_list": 50},
+    "writes": {"todo_write": 40, "conversation_save": 40, "calendar_create": 20},
+    "onboarding": {"onboarding": 1}
+}
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """A named mix, or `scenario=weight,...`."""
+    if spec in MIXES:
+        return MIXES[spec]
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {sorted(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    users: List[VirtualUser],
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    rate: Optional[float] = None
+) -> None:
+    """
+    Run the mix with `concurrency` closed-loop workers for `duration` seconds.
+
+    Args:
+        rate: Optional total target of scenarios per second, spread over the
+            workers; unthrottled when None
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    deadline = time.perf_counter() + duration
+    interval = concurrency / rate if rate else 0.0
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            scenario = SCENARIOS[random.choices(names, weights)[0]]
+            await scenario(client, recorder, users)
+            if interval:
+                await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
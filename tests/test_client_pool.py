@@ -0,0 +1,15 @@
+import logging
+
+from api.src.notion.client_pool import NotionClientPool
+
+
+def test_evicted_clients_do_not_add_log_handlers():
+    sdk_logger = logging.getLogger("notion_client")
+    handlers = len(sdk_logger.handlers)
+    pool = NotionClientPool(max_clients=5)
+
+    for i in range(50):
+        pool.get(f"token-{i}")
+
+    assert len(pool) == 5
+    assert len(sdk_logger.handlers) == handlers
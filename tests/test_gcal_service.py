@@ -0,0 +1,41 @@
+from api.src.services.gcal_service import merge_events
+
+
+def event(event_id, start, **extra):
+    return {"id": event_id, "start": {"dateTime": f"2026-01-01T{start}:00+00:00"}, **extra}
+
+
+def ids(events):
+    return [e["id"] for e in events]
+
+
+def test_merges_ordered_streams_by_start():
+    work = [event("w1", "09:00"), event("w2", "13:00")]
+    home = [event("h1", "08:00"), event("h2", "10:00"), event("h3", "18:00")]
+
+    assert ids(merge_events([work, home], 10)) == ["h1", "w1", "h2", "w2", "h3"]
+
+
+def test_stops_after_max_results():
+    def stream():
+        yield event("a", "09:00")
+        yield event("b", "10:00")
+        raise AssertionError("read past max_results")
+
+    assert ids(merge_events([stream()], 2)) == ["a", "b"]
+
+
+def test_event_shared_into_several_calendars_is_returned_once():
+    shared = {"iCalUID": "meeting@example.com"}
+    primary = [event("p1", "09:00", **shared)]
+    team = [event("t1", "09:00", **shared), event("t2", "11:00")]
+
+    assert ids(merge_events([primary, team], 10)) == ["p1", "t2"]
+
+
+def test_recurring_instances_are_kept():
+    series = {"iCalUID": "standup@example.com", "recurringEventId": "standup"}
+    stream = [event("s1", "09:00", **series), event("s2", "09:00", **{**series, "recurringEventId": "other"})]
+    later = [event("s3", "10:00", **series)]
+
+    assert ids(merge_events([stream, later], 10)) == ["s1", "s2", "s3"]
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from api.src.services.gcal_sync import CalendarSyncEngine, EventStore
+
+
+def ts(clock):
+    """Timestamp of an HH:MM time on the test day."""
+    hour, minute = map(int, clock.split(":"))
+    return datetime(2026, 1, 1, hour, minute, tzinfo=timezone.utc).timestamp()
+
+
+def event(event_id, start, end, **extra):
+    return {
+        "id": event_id,
+        "start": {"dateTime": f"2026-01-01T{start}:00+00:00"},
+        "end": {"dateTime": f"2026-01-01T{end}:00+00:00"},
+        **extra
+    }
+
+
+def ids(events):
+    return [e["id"] for e in events]
+
+
+def test_upcoming_is_ordered_by_start():
+    store = EventStore()
+    store.apply([event("c", "12:00", "13:00"), event("a", "09:00", "10:00"), event("b", "10:30", "11:00")])
+
+    assert ids(store.upcoming(10, now=ts("08:00"))) == ["a", "b", "c"]
+    assert ids(store.upcoming(2, now=ts("08:00"))) == ["a", "b"]
+
+
+def test_upcoming_includes_events_in_progress():
+    store = EventStore()
+    # A long event that started well before a short one
+    store.apply([event("long", "08:00", "18:00"), event("short", "11:00", "11:30")])
+
+    assert ids(store.upcoming(10, now=ts("12:00"))) == ["long"]
+    assert ids(store.upcoming(10, now=ts("10:00"))) == ["long", "short"]
+
+
+def test_upsert_moves_event_and_cancelled_removes_it():
+    store = EventStore()
+    store.apply([event("a", "09:00", "10:00"), event("b", "10:00", "11:00")])
+    store.apply([event("a", "12:00", "13:00")])
+
+    assert ids(store.upcoming(10, now=ts("08:00"))) == ["b", "a"]
+
+    version = store.version
+    store.apply([{"id": "b", "status": "cancelled"}])
+    assert ids(store.upcoming(10, now=ts("08:00"))) == ["a"]
+    assert store.get("b") is None
+    assert store.version == version + 1
+
+
+def test_between_returns_overlapping_events():
+    store = EventStore()
+    store.apply([
+        event("before", "07:00", "08:00"),
+        event("overlaps_start", "08:30", "09:30"),
+        event("inside", "10:00", "10:30"),
+        event("after", "12:00", "13:00")
+    ])
+
+    assert ids(store.between(ts("09:00"), ts("12:00"))) == ["overlaps_start", "inside"]
+
+
+def test_prune_forgets_events_that_ended():
+    store = EventStore()
+    store.apply([event("old", "07:00", "08:00"), event("new", "09:00", "10:00")])
+    store.prune(ts("08:30"))
+
+    assert store.get("old") is None
+    assert ids(store.upcoming(10, now=ts("06:00"))) == ["new"]
+
+
+def test_reset_clears_events_and_sync_token():
+    store = EventStore()
+    store.apply([event("a", "09:00", "10:00")])
+    store.sync_token = "token"
+    store.reset()
+
+    assert store.events == {}
+    assert store.sync_token is None
+    assert store.upcoming(10, now=ts("08:00")) == []
+
+
+def test_sync_locks_are_bounded_by_max_users():
+    engine = CalendarSyncEngine(max_users=3)
+
+    async def no_service():
+        raise RuntimeError("offline")
+
+    async def read_all():
+        for i in range(20):
+            with pytest.raises(RuntimeError):
+                await engine.get_fresh_store(f"user-{i}", no_service)
+
+    asyncio.run(read_all())
+    assert len(engine._locks) == 3
@@ -0,0 +1,53 @@
+from api.src.notion.notion import (
+    MAX_BLOCKS_PER_REQUEST,
+    MAX_CHARS_PER_REQUEST,
+    MAX_RICH_TEXT_LENGTH,
+    iter_block_batches,
+    iter_text_chunks
+)
+
+
+def block_text(block):
+    return block["paragraph"]["rich_text"][0]["text"]["content"]
+
+
+def test_each_line_is_its_own_chunk():
+    assert list(iter_text_chunks("first line\n\nsecond line\n")) == ["first line", "second line"]
+
+
+def test_long_line_is_cut_at_whitespace():
+    words = " ".join(["word"] * 1000)
+    chunks = list(iter_text_chunks(words))
+
+    assert all(len(chunk) <= MAX_RICH_TEXT_LENGTH for chunk in chunks)
+    assert all(not chunk.startswith(" ") and chunk.split(" ")[-1] == "word" for chunk in chunks)
+    assert " ".join(chunks) == words
+
+
+def test_line_without_whitespace_is_cut_at_the_limit():
+    text = "x" * (MAX_RICH_TEXT_LENGTH * 2 + 5)
+
+    assert [len(chunk) for chunk in iter_text_chunks(text)] == [MAX_RICH_TEXT_LENGTH, MAX_RICH_TEXT_LENGTH, 5]
+
+
+def test_batches_respect_block_limit():
+    content = "\n".join(f"line {i}" for i in range(MAX_BLOCKS_PER_REQUEST * 2 + 1))
+    batches = list(iter_block_batches(content))
+
+    assert [len(batch) for batch in batches] == [MAX_BLOCKS_PER_REQUEST, MAX_BLOCKS_PER_REQUEST, 1]
+    assert block_text(batches[1][0]) == f"line {MAX_BLOCKS_PER_REQUEST}"
+
+
+def test_batches_respect_character_limit():
+    line = "y" * MAX_RICH_TEXT_LENGTH
+    content = "\n".join([line] * (MAX_CHARS_PER_REQUEST // MAX_RICH_TEXT_LENGTH + 1))
+    batches = list(iter_block_batches(content))
+
+    assert len(batches) == 2
+    for batch in batches:
+        assert len(batch) <= MAX_BLOCKS_PER_REQUEST
+        assert sum(len(block_text(block)) for block in batch) <= MAX_CHARS_PER_REQUEST
+
+
+def test_empty_content_has_no_batches():
+    assert list(iter_block_batches("")) == []
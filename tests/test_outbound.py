@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from api.src.services.outbound import MAX_RETRIES, UPSTREAM_LIMITS, OutboundLimiter, UpstreamRateLimited
+from api.src.utils import TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class UpstreamError(Exception):
+    """Shaped like notion_client's HTTP errors."""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+
+
+def failing(*errors, result="ok"):
+    """Coroutine factory that raises the given errors in turn, then returns result."""
+    errors = list(errors)
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    # Fast buckets, so only penalties make a call wait
+    for upstream in UPSTREAM_LIMITS:
+        monkeypatch.setitem(UPSTREAM_LIMITS, upstream, (1000.0, 1000.0))
+    limiter = OutboundLimiter()
+    limiter.backoff = lambda attempt: 0.0
+    return limiter
+
+
+def test_reserve_spends_burst_then_queues_at_rate():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.now += 10
+    # Refill is capped at the capacity
+    assert bucket.reserve(2) == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_reserve_charges_the_cost():
+    clock = Clock()
+    bucket = TokenBucket(rate=10, capacity=10, clock=clock)
+
+    assert bucket.reserve(10) == 0
+    assert bucket.reserve(5) == pytest.approx(0.5)
+
+
+def test_penalize_holds_the_bucket_for_the_given_time():
+    clock = Clock()
+    bucket = TokenBucket(rate=4, capacity=4, clock=clock)
+    bucket.penalize(3)
+
+    assert bucket.reserve() == pytest.approx(3.25)
+    clock.now += 5
+    assert bucket.reserve() == 0
+
+
+def test_penalize_does_not_shorten_a_longer_wait():
+    clock = Clock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock)
+    bucket.penalize(10)
+    bucket.penalize(2)
+
+    assert bucket.reserve() == pytest.approx(11)
+
+
+def test_active_bucket_outlives_the_idle_timeout():
+    clock = Clock()
+    limiter = OutboundLimiter(idle_timeout=60, clock=clock)
+    bucket = limiter.bucket("notion", "t")
+    for _ in range(5):
+        clock.now += 50
+        assert limiter.bucket("notion", "t") is bucket
+
+    clock.now += 61
+    assert limiter.bucket("notion", "t") is not bucket
+
+
+def test_429_is_retried_after_penalizing_the_bucket(limiter):
+    fn = failing(UpstreamError(429, retry_after=0.05))
+    penalties = []
+    bucket = limiter.bucket("notion", "t")
+    penalize = bucket.penalize
+    bucket.penalize = lambda seconds: penalties.append(seconds) or penalize(seconds)
+
+    assert asyncio.run(limiter.call("notion", "t", fn, idempotent=False)) == "ok"
+    assert len(fn.calls) == 2
+    assert penalties == [0.05]
+    assert limiter.counters["notion"]["rate_limited"] == 1
+    assert limiter.counters["notion"]["retries"] == 1
+
+
+def test_persistent_429_raises_upstream_rate_limited(limiter):
+    fn = failing(*[UpstreamError(429, retry_after=0)] * (MAX_RETRIES + 1))
+
+    with pytest.raises(UpstreamRateLimited) as raised:
+        asyncio.run(limiter.call("notion", "t", fn))
+    assert raised.value.status_code == 429
+    assert len(fn.calls) == MAX_RETRIES + 1
+
+
+def test_5xx_is_retried_for_idempotent_calls_only(limiter):
+    fn = failing(UpstreamError(503), UpstreamError(502))
+    assert asyncio.run(limiter.call("notion", "t", fn)) == "ok"
+    assert len(fn.calls) == 3
+
+    fn = failing(UpstreamError(503))
+    with pytest.raises(UpstreamError):
+        asyncio.run(limiter.call("notion", "t", fn, idempotent=False))
+    assert len(fn.calls) == 1
+
+
+def test_client_errors_are_not_retried(limiter):
+    fn = failing(UpstreamError(400))
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(limiter.call("notion", "t", fn))
+    assert len(fn.calls) == 1
+    assert limiter.counters["notion"]["failures"] == 1
+
+
+def test_call_sync_retries_like_call(limiter):
+    errors = [UpstreamError(429, retry_after=0), UpstreamError(500)]
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert limiter.call_sync("google", "t", fn) == "ok"
+    assert len(calls) == 3
+    assert limiter.counters["google"]["retries"] == 2
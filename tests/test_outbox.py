@@ -0,0 +1,210 @@
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+from api.src.db import outbox as outbox_module
+from api.src.db.outbox import LeaseLost, Outbox, OutboxWorkerPool
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbox_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def box(tmp_path, clock):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"))
+    yield box
+    box.close()
+
+
+def test_claim_takes_due_jobs_once(box, clock):
+    first = box.enqueue("k", {"n": 1})
+    box.enqueue("k", {"n": 2})
+
+    job = box.claim("a")
+    assert job["id"] == first
+    assert job["payload"] == {"n": 1}
+    assert job["attempts"] == 1
+    assert job["progress"] == {}
+    assert box.claim("b")["payload"] == {"n": 2}
+    assert box.claim("c") is None
+
+
+def test_retry_waits_for_next_attempt(box, clock):
+    job_id = box.enqueue("k", {})
+    box.claim("a")
+    box.retry(job_id, "a", "boom", delay=30)
+
+    assert box.get(job_id)["status"] == "pending"
+    assert box.claim("a") is None
+    clock.now += 31
+    job = box.claim("a")
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+
+
+def test_live_lease_is_not_taken_over(box, clock):
+    job_id = box.enqueue("k", {})
+    box.claim("a", lease=60)
+    clock.now += 30
+
+    assert box.claim("b", lease=60) is None
+    assert box.recover(lease=60) == 0
+    assert box.get(job_id)["status"] == "running"
+
+
+def test_expired_lease_is_taken_over_and_old_owner_fenced(box, clock):
+    job_id = box.enqueue("k", {})
+    box.claim("a", lease=60)
+    box.checkpoint(job_id, "a", {"page_id": "p1"})
+    clock.now += 61
+
+    job = box.claim("b", lease=60)
+    assert job["id"] == job_id
+    assert job["progress"] == {"page_id": "p1"}
+
+    # The old owner's writes are ignored
+    assert box.renew(job_id, "a") is False
+    with pytest.raises(LeaseLost):
+        box.checkpoint(job_id, "a", {"page_id": "p2"})
+    box.complete(job_id, "a", "stale")
+    assert box.get(job_id)["status"] == "running"
+
+    box.complete(job_id, "b", "ok")
+    assert box.get(job_id)["status"] == "done"
+    assert box.get(job_id)["result"] == "ok"
+
+
+def test_renew_keeps_the_lease(box, clock):
+    job_id = box.enqueue("k", {})
+    box.claim("a", lease=60)
+    clock.now += 50
+    assert box.renew(job_id, "a") is True
+    clock.now += 50
+
+    assert box.claim("b", lease=60) is None
+
+
+def test_recover_requeues_only_expired_leases(box, clock):
+    stale = box.enqueue("k", {})
+    box.claim("a", lease=60)
+    clock.now += 61
+    live = box.enqueue("k", {})
+    box.claim("b", lease=60)
+
+    assert box.recover(lease=60) == 1
+    assert box.get(stale)["status"] == "pending"
+    assert box.get(live)["status"] == "running"
+
+
+def test_release_requeues_an_owners_jobs(box, clock):
+    mine = box.enqueue("k", {})
+    box.claim("a")
+    theirs = box.enqueue("k", {})
+    box.claim("b")
+
+    assert box.release("a") == 1
+    assert box.get(mine)["status"] == "pending"
+    assert box.get(theirs)["status"] == "running"
+
+
+def test_existing_database_is_migrated(tmp_path, clock):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+        "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, "
+        "last_error TEXT, result TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO jobs VALUES ('old', 'k', '{}', 'running', 1, 0, NULL, NULL, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    box = Outbox(path)
+    # A job left running before leases existed has no claim to respect
+    assert box.claim("a")["id"] == "old"
+    box.close()
+
+
+def run_pool(box, handler, until, max_attempts=3):
+    async def main():
+        pool = OutboxWorkerPool(box, workers=1, max_attempts=max_attempts)
+        pool.backoff = lambda attempts: 0
+        pool.register("k", handler)
+        await pool.start()
+        job_id = await pool.submit("k", {})
+        for _ in range(200):
+            if box.get(job_id)["status"] in until:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return box.get(job_id)
+
+    return asyncio.run(main())
+
+
+def test_pool_retries_then_completes(tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"))
+    calls = []
+
+    async def flaky(payload, progress):
+        calls.append(progress.state.get("step"))
+        if len(calls) == 1:
+            await progress.save(step=1)
+            raise RuntimeError("transient")
+        return "ok"
+
+    job = run_pool(box, flaky, until={"done", "failed"})
+
+    assert job["status"] == "done"
+    assert job["result"] == "ok"
+    # The retry resumed from the saved progress
+    assert calls == [None, 1]
+
+
+def test_pool_fails_permanent_errors_at_once(tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"))
+
+    async def rejected(payload, progress):
+        raise HTTPException(status_code=404, detail="No integration")
+
+    job = run_pool(box, rejected, until={"done", "failed"})
+
+    assert job["status"] == "failed"
+    assert job["attempts"] == 1
+    assert job["last_error"] == "No integration"
+
+
+def test_pool_survives_database_errors(tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"))
+    claim = box.claim
+    failures = []
+
+    def locked_once(owner):
+        if not failures:
+            failures.append(owner)
+            raise sqlite3.OperationalError("database is locked")
+        return claim(owner)
+
+    box.claim = locked_once
+
+    async def ok(payload, progress):
+        return "ok"
+
+    job = run_pool(box, ok, until={"done"})
+
+    assert failures
+    assert job["status"] == "done"
@@ -0,0 +1,100 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from api.src.services.scheduler import free_intervals, merge_intervals, plan_schedule
+
+UTC = ZoneInfo("UTC")
+
+
+def at(hour, minute=0, day=19):
+    """A time on Monday 2026-10-19 (or another day of that week)."""
+    return datetime(2026, 10, day, hour, minute, tzinfo=UTC)
+
+
+def ts(hour, minute=0, day=19):
+    return at(hour, minute, day).timestamp()
+
+
+def slots(result):
+    return [(p["todo_id"], p["start"][11:16], p["end"][11:16]) for p in result["proposals"]]
+
+
+def test_merge_intervals_coalesces_overlapping_and_touching():
+    assert merge_intervals([(5, 6), (1, 3), (2, 4), (4, 4.5), (8, 9)]) == [(1, 4.5), (5, 6), (8, 9)]
+    assert merge_intervals([]) == []
+
+
+def test_free_intervals_subtracts_busy_time_from_windows():
+    windows = [(0, 10), (20, 30)]
+    busy = [(2, 4), (3, 5), (8, 22), (25, 26)]
+
+    assert free_intervals(busy, windows) == [(0, 2), (5, 8), (22, 25), (26, 30)]
+
+
+def test_free_intervals_without_busy_time_is_the_windows():
+    assert free_intervals([], [(0, 10), (20, 30)]) == [(0, 10), (20, 30)]
+
+
+def test_earliest_deadline_is_placed_first():
+    todos = [
+        {"id": "later", "name": "b", "priority": "High", "due_date": "2026-10-21"},
+        {"id": "sooner", "name": "a", "priority": "Low", "due_date": "2026-10-19"},
+        {"id": "done", "name": "c", "status": True},
+        {"id": "undated", "name": "d", "priority": "High"}
+    ]
+    result = plan_schedule(todos, [], at(9), at(17), UTC, duration_minutes=60, buffer_minutes=0)
+
+    assert slots(result) == [("sooner", "09:00", "10:00"), ("later", "10:00", "11:00"), ("undated", "11:00", "12:00")]
+    assert result["unscheduled"] == []
+
+
+def test_priority_breaks_deadline_ties():
+    todos = [
+        {"id": "low", "name": "a", "priority": "Low"},
+        {"id": "high", "name": "b", "priority": "High"}
+    ]
+    result = plan_schedule(todos, [], at(9), at(17), UTC, duration_minutes=60, buffer_minutes=0)
+
+    assert [p["todo_id"] for p in sorted(result["proposals"], key=lambda p: p["start"])] == ["high", "low"]
+
+
+def test_blocks_keep_the_buffer_around_busy_time():
+    busy = [(ts(10), ts(11))]
+    todos = [{"id": str(i), "name": str(i)} for i in range(3)]
+    result = plan_schedule(
+        todos, busy, at(9), at(17), UTC, duration_minutes=45, buffer_minutes=15, granularity_minutes=15
+    )
+
+    assert slots(result) == [("0", "09:00", "09:45"), ("1", "11:15", "12:00"), ("2", "12:15", "13:00")]
+
+
+def test_block_starts_are_aligned_to_granularity():
+    busy = [(ts(9), ts(9, 7))]
+    result = plan_schedule(
+        [{"id": "a", "name": "a"}], busy, at(9), at(17), UTC,
+        duration_minutes=30, buffer_minutes=0, granularity_minutes=15
+    )
+
+    assert slots(result) == [("a", "09:15", "09:45")]
+
+
+def test_late_and_unscheduled_todos_are_flagged():
+    todos = [
+        {"id": "overdue", "name": "a", "due_date": "2026-10-19T09:30:00+00:00"},
+        {"id": "no_room", "name": "b"}
+    ]
+    result = plan_schedule(todos, [], at(9), at(10), UTC, duration_minutes=60, buffer_minutes=0)
+
+    assert slots(result) == [("overdue", "09:00", "10:00")]
+    assert result["proposals"][0]["late"] is True
+    assert [todo["todo_id"] for todo in result["unscheduled"]] == ["no_room"]
+
+
+def test_weekends_are_skipped_by_default():
+    # Saturday 2026-10-24 to Monday 2026-10-26
+    result = plan_schedule(
+        [{"id": "a", "name": "a"}], [], at(9, day=24), at(17, day=26), UTC,
+        duration_minutes=60, buffer_minutes=0
+    )
+
+    assert result["proposals"][0]["start"].startswith("2026-10-26T09:00")
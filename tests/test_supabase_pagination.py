@@ -0,0 +1,98 @@
+import asyncio
+import base64
+import json
+import operator
+
+import pytest
+
+from api.src.db import supabase
+from api.src.db.supabase import async_select_page, decode_cursor, encode_cursor
+
+KEYS = ("created_at", "conversation_id")
+COMPARE = {"lt": operator.lt, "gt": operator.gt, "lte": operator.le, "gte": operator.ge}
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.fixture
+def rows(monkeypatch):
+    """In-memory table standing in for PostgREST."""
+    table = []
+
+    async def select(table_name, columns="*", filters=None, order_by=None, limit=None,
+                     offset=None, supabase=None, ranges=None):
+        found = [
+            row for row in table
+            if all(row[column] == value for column, value in (filters or {}).items())
+            and all(
+                COMPARE[op](row[column], value)
+                for column, bounds in (ranges or {}).items()
+                for op, value in bounds.items()
+            )
+        ]
+        for column, direction in reversed(list((order_by or {}).items())):
+            found.sort(key=lambda row: row[column], reverse=direction == "desc")
+        return found[:limit]
+
+    monkeypatch.setattr(supabase, "async_select_data", select)
+    return table
+
+
+def all_pages(limit, filters=None):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = asyncio.run(async_select_page(
+            "conversations", "conversation_id", filters, keys=KEYS, limit=limit, cursor=cursor
+        ))
+        ids += [row["conversation_id"] for row in page["rows"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_round_trip():
+    row = {"created_at": "2026-01-01T00:00:00.000Z", "conversation_id": "c1", "other": 1}
+    cursor = encode_cursor(row, KEYS)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ["2026-01-01T00:00:00.000Z", "c1"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "garbage!",
+    raw_cursor({"created_at": "2026-01-01T00:00:00Z"}),
+    raw_cursor(["2026-01-01T00:00:00Z"]),
+    raw_cursor([None, "c1"]),
+    raw_cursor(["yesterday", "c1"]),
+    raw_cursor(["2026-01-01T00:00:00Z", 7]),
+    raw_cursor(["2026-01-01T00:00:00Z", ""]),
+    raw_cursor([{"a": 1}, "c1"])
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_row_once_across_ties(rows):
+    # Groups of five rows share a created_at, so pages end inside ties
+    for i in range(23):
+        rows.append({"created_at": f"2026-01-{1 + i // 5:02d}T00:00:00Z", "conversation_id": f"c{i:02d}", "user_id": "u1"})
+    rows.append({"created_at": "2026-01-01T00:00:00Z", "conversation_id": "other", "user_id": "u2"})
+
+    ids, pages = all_pages(limit=3, filters={"user_id": "u1"})
+
+    assert ids == [f"c{i:02d}" for i in reversed(range(23))]
+    assert pages == 8
+
+
+def test_exact_multiple_of_limit_has_no_empty_last_page(rows):
+    for i in range(6):
+        rows.append({"created_at": "2026-01-01T00:00:00Z", "conversation_id": f"c{i}"})
+
+    ids, pages = all_pages(limit=3)
+
+    assert ids == ["c5", "c4", "c3", "c2", "c1", "c0"]
+    assert pages == 2
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from api.src.utils import conditional_response, etag_matches, make_etag
+
+ETAG = make_etag("todos", [("a", "2026-01-01")])
+
+
+def test_make_etag_is_quoted_and_content_sensitive():
+    assert ETAG.startswith('"') and ETAG.endswith('"')
+    assert ETAG == make_etag("todos", [("a", "2026-01-01")])
+    assert ETAG != make_etag("todos", [("a", "2026-01-02")])
+    assert ETAG != make_etag("todos", [("a", "2026-01-01")], ("name",))
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    (ETAG, True),
+    (f"W/{ETAG}", True),
+    (f'"other", {ETAG}', True),
+    ('"other"', False),
+    (ETAG.strip('"'), False),
+    ("*", True),
+    (" * ", True)
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, ETAG) is expected
+
+
+def test_conditional_response_returns_304_without_building_content():
+    def content():
+        raise AssertionError("content built for a 304")
+
+    response = conditional_response(content, ETAG, ETAG)
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+def test_conditional_response_returns_content_when_stale():
+    response = conditional_response(lambda: {"items": [1, 2]}, ETAG, '"stale"')
+
+    assert response.status_code == 200
+    assert json.loads(response.body) == {"items": [1, 2]}
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == "private, no-cache"